@@ -1,31 +1,126 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+from functools import lru_cache
 from pathlib import Path
-from app.routers import healthcheck, buildcache, cachemap, elevation
+import os
+
+# ORJSONResponse encodes response bodies several times faster than the
+# stdlib-json default; fall back to JSONResponse if orjson is missing
+try:
+    import orjson  # noqa: F401 - presence check for ORJSONResponse
+    from fastapi.responses import ORJSONResponse as _DefaultResponseClass
+except ImportError:
+    _DefaultResponseClass = JSONResponse
+
+# Static map bundle location, resolved once at import. create_app only
+# consults these cached values, so repeated factory calls (e.g. one per
+# test fixture) do not re-stat the filesystem.
+MAP_STATIC_PATH = (Path(__file__).resolve().parent.parent / "mapapp" / "out")
+_MAP_EXISTS = MAP_STATIC_PATH.exists()
+
+
+@lru_cache(maxsize=1)
+def get_root_router() -> APIRouter:
+    """
+    Build the flattened root router on first use.
+
+    Router modules are imported lazily here so that `import app` stays
+    cheap: the routers transitively pull in geopy, rasterio wrappers and
+    the Pydantic request/response models, which processes that never
+    serve routes (CLI tools, workers) should not pay for.
+
+    app.include_router deep-copies every route and rebuilds its Pydantic
+    response models, so doing it four times per create_app call is a
+    measurable startup cost; merging here leaves a single app-level
+    include_router per create_app call.
+    """
+    from app.routers import healthcheck, buildcache, cachemap, elevation
+
+    root_router = APIRouter()
+    root_router.include_router(healthcheck.router, tags=["Health"])
+    root_router.include_router(buildcache.router, tags=["Cache"])
+    root_router.include_router(cachemap.router, tags=["Cache"])
+    root_router.include_router(elevation.router, tags=["Elevation"])
+    return root_router
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """
+    Validate configuration once at startup.
+
+    Checking the OpenTopography API key here instead of inside every
+    request handler surfaces a missing key at deploy time and removes a
+    branch from the hot path.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.config import get_settings
+
+    # Bound the default executor so blocking GDAL work offloaded with
+    # asyncio.to_thread cannot fan out into dozens of threads
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=4, thread_name_prefix="blocking-io")
+    )
+
+    settings = get_settings()
+    if not settings.topo_api_key or settings.topo_api_key == "your_api_key_here":
+        raise RuntimeError(
+            "OpenTopography API key not configured. Please set TOPO_API_KEY in .env file"
+        )
+
+    # Pin GDAL's block/VSI cache sizes before any raster is opened
+    from app.services.elevation_service import configure_gdal_env
+    configure_gdal_env()
+
+    # Open the download service's pooled HTTP session now, on the
+    # serving loop, so the first /buildcache request does not pay
+    # connector and TLS-context setup
+    from app.services.opentopography import get_ot_service
+    get_ot_service().warm_session()
+
+    yield
+
+    # Release the pooled HTTP session held by the download service,
+    # flush any elevation log records still queued for writing and
+    # close cached raster dataset handles
+    from app.services.elevation_logger import get_elevation_logger
+    from app.services.elevation_service import close_datasets
+    await get_ot_service().close()
+    await get_elevation_logger().stop()
+    close_datasets()
 
 
 def create_app() -> FastAPI:
     """
     Application factory for creating FastAPI instance
     """
+    # FASTAPI_NO_DOCS=1 disables the OpenAPI schema and docs entirely,
+    # which also skips importing fastapi.openapi.models on cold start
+    docs_disabled = os.getenv("FASTAPI_NO_DOCS") == "1"
+
     app = FastAPI(
         title="Copernicus FastAPI",
         description="FastAPI application for Copernicus DEM data",
-        version="1.0.0"
+        version="1.0.0",
+        openapi_url=None if docs_disabled else "/openapi.json",
+        default_response_class=_DefaultResponseClass,
+        lifespan=_lifespan
     )
 
-    # Include routers
-    app.include_router(healthcheck.router, tags=["Health"])
-    app.include_router(buildcache.router, tags=["Cache"])
-    app.include_router(cachemap.router, tags=["Cache"])
-    app.include_router(elevation.router, tags=["Elevation"])
+    # One include_router over the pre-merged router: this re-creates
+    # the routes bound to this app (so app.dependency_overrides works -
+    # each route captures its provider at creation time) instead of
+    # sharing route objects across factory calls
+    app.include_router(get_root_router())
 
     # Mount static map application
-    map_static_path = Path(__file__).parent.parent / "mapapp" / "out"
-    if map_static_path.exists():
+    if _MAP_EXISTS:
         # Mount static files for map application
-        app.mount("/map", StaticFiles(directory=str(map_static_path), html=True), name="map")
+        app.mount("/map", StaticFiles(directory=str(MAP_STATIC_PATH), html=True), name="map")
         
         # Redirect /mapapp to /map/ for consistency
         @app.get("/mapapp")
@@ -33,6 +128,11 @@ def create_app() -> FastAPI:
         async def redirect_to_map():
             from fastapi.responses import RedirectResponse
             return RedirectResponse(url="/map/", status_code=301)
-    
+
+    # Materialize the OpenAPI schema now so the first /openapi.json or
+    # /docs hit does not pay for a lazy schema build under load
+    if not docs_disabled:
+        app.openapi_schema = app.openapi()
+
     return app
 
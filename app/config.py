@@ -1,8 +1,12 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dataclasses import dataclass
 from functools import lru_cache
+import logging
 import os
 from io import StringIO
-from dotenv import load_dotenv
+from dotenv import dotenv_values
+
+logger = logging.getLogger(__name__)
 
 
 def load_environment_variables():
@@ -10,22 +14,32 @@ def load_environment_variables():
     Load environment variables from appropriate source:
     - GCP Cloud Run: Load from AppSecretsFromDotEnv environment variable (Secret Manager)
     - Local Development: Load from .env file
+
+    Only the first call per process does any work; reloads and forked
+    workers skip the dotenv re-parse via the sentinel below.
     """
+    if os.environ.get("_APP_ENV_LOADED") == "1":
+        return
+
     # Check if running in GCP Cloud Run with Secret Manager mounted as env var
     secret_content = os.getenv("AppSecretsFromDotEnv")
     
     if secret_content:
         # Running in Cloud Run - parse the secret content as dotenv format
-        print("Loading environment variables from GCP Secret Manager (AppSecretsFromDotEnv)")
-        load_dotenv(stream=StringIO(secret_content), override=True)
+        logger.info("Loading environment variables from GCP Secret Manager (AppSecretsFromDotEnv)")
+        values = dotenv_values(stream=StringIO(secret_content))
+        os.environ.update({k: v for k, v in values.items() if v is not None})
     else:
         # Running locally - load from .env file
         env_file = ".env"
         if os.path.exists(env_file):
-            print(f"Loading environment variables from {env_file}")
-            load_dotenv(env_file, override=True)
+            logger.info("Loading environment variables from %s", env_file)
+            values = dotenv_values(env_file)
+            os.environ.update({k: v for k, v in values.items() if v is not None})
         else:
-            print("No .env file found, using default environment variables")
+            logger.info("No .env file found, using default environment variables")
+
+    os.environ["_APP_ENV_LOADED"] = "1"
 
 
 # Load environment variables on module import
@@ -43,16 +57,54 @@ class Settings(BaseSettings):
     target_dir: str = "tilescache"
     log_dir: str = "logs"
     topo_api_key: str = ""
-    
-    class Config:
-        # Pydantic will read from os.environ after dotenv loads
-        case_sensitive = False
+    # Global cap on in-flight OpenTopography tile downloads
+    topo_max_inflight: int = 8
+    # Include derived middleware_calculations in elevation log records
+    log_verbose: bool = False
+    # GDAL raster block cache, in megabytes. The GDAL default (5% of
+    # RAM per process) over-allocates under multi-worker uvicorn.
+    gdal_cachemax: int = 128
+    # VSI (file I/O) cache size in bytes
+    vsi_cache_size: int = 1 << 25
+
+    # Pydantic will read from os.environ after dotenv loads
+    model_config = SettingsConfigDict(case_sensitive=False)
+
+
+@dataclass(slots=True, frozen=True)
+class _FrozenSettings:
+    """
+    Immutable snapshot of validated settings.
+
+    Plain slotted dataclass so attribute access on the hot path is a
+    direct slot load instead of going through Pydantic, and instances
+    are hashable for use as lru_cache keys.
+    """
+    target_dir: str
+    log_dir: str
+    topo_api_key: str
+    topo_max_inflight: int
+    log_verbose: bool
+    gdal_cachemax: int
+    vsi_cache_size: int
 
 
 @lru_cache()
-def get_settings() -> Settings:
+def get_settings() -> _FrozenSettings:
     """
-    Get cached settings instance
+    Get cached settings instance.
+
+    Settings (BaseSettings) validates the environment once; the result
+    is frozen into a lightweight dataclass for all downstream access.
     """
-    return Settings()
+    s = Settings()
+    return _FrozenSettings(
+        target_dir=s.target_dir,
+        log_dir=s.log_dir,
+        topo_api_key=s.topo_api_key,
+        topo_max_inflight=s.topo_max_inflight,
+        log_verbose=s.log_verbose,
+        gdal_cachemax=s.gdal_cachemax,
+        vsi_cache_size=s.vsi_cache_size
+    )
 
@@ -1,13 +1,58 @@
-from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import Optional
-from enum import Enum
-from geopy.distance import geodesic
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+from typing import Literal, Optional
+import math
 
+# Approximate kilometers per degree of latitude (and of longitude at the
+# equator); good enough for a cheap upper-bound check before doing any
+# precise distance math.
+KM_PER_DEGREE = 111.32
 
-class DEMResolution(str, Enum):
-    """DEM resolution options"""
-    GLO_30 = "GLO-30"
-    GLO_90 = "GLO-90"
+_EARTH_RADIUS_KM = 6371.0088
+
+# pyproj's Geod is C-backed and much faster than pure-Python geodesic
+# solvers; fall back to the haversine helper below if it is unavailable
+try:
+    from pyproj import Geod
+    _GEOD = Geod(ellps="WGS84")
+except ImportError:
+    _GEOD = None
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points in kilometers.
+
+    Closed-form haversine using only math builtins - roughly an order of
+    magnitude faster than geopy's iterative geodesic solver and accurate
+    to well under 1% at the ~100 km scales validated here.
+    """
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlon = math.radians(lon2 - lon1)
+
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    )
+    return 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _precise_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Ellipsoidal distance between two points in kilometers.
+
+    Uses pyproj's WGS84 geodesic (compiled C) when available, otherwise
+    the spherical haversine approximation.
+    """
+    if _GEOD is not None:
+        return _GEOD.inv(lon1, lat1, lon2, lat2)[2] / 1000.0
+    return _haversine_km(lat1, lon1, lat2, lon2)
+
+
+# DEM resolution options. A Literal validates faster than a str Enum in
+# Pydantic v2 and spares callers the .value round-trip.
+DEMResolution = Literal["GLO-30", "GLO-90"]
 
 
 class BuildCacheParams(BaseModel):
@@ -43,7 +88,7 @@ class BuildCacheParams(BaseModel):
         examples=[25.1]
     )
     resolution: DEMResolution = Field(
-        default=DEMResolution.GLO_30,
+        default="GLO-30",
         description="DEM resolution: GLO-30 (30m) or GLO-90 (90m)"
     )
     buffer_km: Optional[float] = Field(
@@ -57,46 +102,72 @@ class BuildCacheParams(BaseModel):
         description="Redownload files even if they already exist"
     )
 
-    @field_validator("max_lat")
-    @classmethod
-    def validate_max_lat(cls, v, info):
-        """Ensure max_lat is greater than min_lat"""
-        if "min_lat" in info.data and v <= info.data["min_lat"]:
-            raise ValueError("max_lat must be greater than min_lat")
-        return v
+    # Bounding box dimensions computed during validation so callers can
+    # reuse them instead of recomputing the same distances
+    _north_south_km: float = PrivateAttr(default=0.0)
+    _east_west_km: float = PrivateAttr(default=0.0)
 
-    @field_validator("max_lon")
-    @classmethod
-    def validate_max_lon(cls, v, info):
-        """Ensure max_lon is greater than min_lon"""
-        if "min_lon" in info.data and v <= info.data["min_lon"]:
-            raise ValueError("max_lon must be greater than min_lon")
-        return v
+    @property
+    def north_south_km(self) -> float:
+        """North-south extent of the bounding box in kilometers"""
+        return self._north_south_km
+
+    @property
+    def east_west_km(self) -> float:
+        """East-west extent of the bounding box in kilometers"""
+        return self._east_west_km
 
     @model_validator(mode='after')
     def validate_bounding_box_size(self):
         """
-        Ensure the bounding box is not larger than 100km on any side
+        Ensure the bounds are correctly ordered and the bounding box is
+        not larger than 100km on any side
         """
+        # Ordering checks live here too so the model is traversed by a
+        # single validator instead of two field validators plus this one
+        if self.max_lat <= self.min_lat:
+            raise ValueError("max_lat must be greater than min_lat")
+
+        if self.max_lon <= self.min_lon:
+            raise ValueError("max_lon must be greater than min_lon")
+
         # Calculate center longitude for more accurate east-west distance
         center_lon = (self.min_lon + self.max_lon) / 2
         center_lat = (self.min_lat + self.max_lat) / 2
-        
-        # Calculate north-south distance (latitude difference)
-        north_south_distance = geodesic(
-            (self.min_lat, center_lon),
-            (self.max_lat, center_lon)
-        ).kilometers
-        
-        # Calculate east-west distance (longitude difference)
-        # Use center latitude for more accurate calculation
-        east_west_distance = geodesic(
-            (center_lat, self.min_lon),
-            (center_lat, self.max_lon)
-        ).kilometers
-        
+
         max_distance = 100.0  # km
-        
+
+        # Cheap degree-based upper bound first: if the box is clearly
+        # well inside the limit, skip the geodesic math entirely (the
+        # overwhelmingly common case). The east-west bound uses the
+        # latitude in the box closest to the equator, where a degree of
+        # longitude is widest, so it can never under-estimate.
+        if self.min_lat <= 0.0 <= self.max_lat:
+            widest_lat = 0.0
+        else:
+            widest_lat = min(abs(self.min_lat), abs(self.max_lat))
+
+        approx_ns = (self.max_lat - self.min_lat) * KM_PER_DEGREE
+        approx_ew = (self.max_lon - self.min_lon) * KM_PER_DEGREE * math.cos(
+            math.radians(widest_lat)
+        )
+
+        if approx_ns < 95.0 and approx_ew < 95.0:
+            self._north_south_km = approx_ns
+            self._east_west_km = approx_ew
+            return self
+
+        # Borderline box: compute precise distances
+        north_south_distance = _precise_distance_km(
+            self.min_lat, center_lon, self.max_lat, center_lon
+        )
+        east_west_distance = _precise_distance_km(
+            center_lat, self.min_lon, center_lat, self.max_lon
+        )
+
+        self._north_south_km = north_south_distance
+        self._east_west_km = east_west_distance
+
         if north_south_distance > max_distance:
             raise ValueError(
                 f"Bounding box is too large: north-south distance is {north_south_distance:.2f} km, "
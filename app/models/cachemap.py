@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 from app.models.buildcache import DEMResolution
@@ -36,7 +37,7 @@ class CacheMapParams(BaseModel):
         examples=[27.0]
     )
     resolution: DEMResolution = Field(
-        default=DEMResolution.GLO_30,
+        default="GLO-30",
         description="DEM resolution: GLO-30 (30m) or GLO-90 (90m)"
     )
     buffer_km: Optional[float] = Field(
@@ -67,6 +68,25 @@ class CacheMapParams(BaseModel):
         return v
 
 
+@dataclass(slots=True, frozen=True)
+class GridSquareCore:
+    """
+    Lightweight in-memory form of a grid square.
+
+    A continent AOI produces 10k+ squares that are held for the whole
+    download phase; slots drop the per-instance __dict__ a Pydantic
+    model carries. Converted to GridSquare only at the response
+    boundary.
+    """
+    square_id: str
+    min_lat: float
+    max_lat: float
+    min_lon: float
+    max_lon: float
+    center_lat: float
+    center_lon: float
+
+
 class GridSquare(BaseModel):
     """Represents a single 100km square in the grid"""
     square_id: str
@@ -77,6 +97,19 @@ class GridSquare(BaseModel):
     center_lat: float
     center_lon: float
 
+    @classmethod
+    def from_core(cls, core: GridSquareCore) -> "GridSquare":
+        """Wrap a GridSquareCore without re-validating its fields"""
+        return cls.model_construct(
+            square_id=core.square_id,
+            min_lat=core.min_lat,
+            max_lat=core.max_lat,
+            min_lon=core.min_lon,
+            max_lon=core.max_lon,
+            center_lat=core.center_lat,
+            center_lon=core.center_lon
+        )
+
 
 class SquareResult(BaseModel):
     """Result of processing a single square"""
@@ -85,7 +118,13 @@ class SquareResult(BaseModel):
     tiles_downloaded: int
     tiles_skipped: int
     tiles_failed: int
-    execution_time_seconds: float
+    execution_time_seconds: float = Field(
+        default=0.0,
+        description=(
+            "Always 0.0: squares are downloaded as one deduplicated "
+            "batch, so per-square timing is not tracked"
+        )
+    )
     error: Optional[str] = None
 
 
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field
+
+from app.models.buildcache import DEMResolution
 
 
 class PointElevationRequest(BaseModel):
@@ -20,22 +22,6 @@ class PointElevationRequest(BaseModel):
         examples=[26.2353500]
     )
 
-    @field_validator("latitude")
-    @classmethod
-    def validate_latitude(cls, v):
-        """Validate latitude is within valid range"""
-        if not -90 <= v <= 90:
-            raise ValueError("Latitude must be between -90 and 90 degrees")
-        return v
-
-    @field_validator("longitude")
-    @classmethod
-    def validate_longitude(cls, v):
-        """Validate longitude is within valid range"""
-        if not -180 <= v <= 180:
-            raise ValueError("Longitude must be between -180 and 180 degrees")
-        return v
-
 
 class PointElevationResponse(BaseModel):
     """
@@ -51,6 +37,45 @@ class PointElevationResponse(BaseModel):
     message: str | None = None
 
 
+class BatchElevationRequest(BaseModel):
+    """
+    Request model for batch elevation query
+    """
+    points: list[PointElevationRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=10000,
+        description="Points to query, up to 10,000 per request"
+    )
+    resolution: DEMResolution = Field(
+        default="GLO-30",
+        description="DEM resolution: GLO-30 (30m) or GLO-90 (90m)"
+    )
+
+
+class BatchPointResult(BaseModel):
+    """
+    Elevation result for one point of a batch query
+    """
+    latitude: float
+    longitude: float
+    elevation_meters: float | None
+    tile_used: str | None
+    status: str
+    message: str | None = None
+
+
+class BatchElevationResponse(BaseModel):
+    """
+    Response model for batch elevation query
+    """
+    points: list[BatchPointResult]
+    count: int
+    success_count: int
+    resolution: str
+    data_source: str = "Copernicus DEM"
+
+
 class ElevationDifferenceRequest(BaseModel):
     """
     Request model for elevation difference between two points
@@ -1,60 +1,99 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import ValidationError
 from app.config import Settings, get_settings
 from app.models.buildcache import BuildCacheParams, BuildCacheResponse, DEMResolution
 from app.services.tile_utils import normalize_aoi, compute_tile_keys
-from app.services.opentopography import OpenTopographyService
+from app.services.opentopography import OpenTopographyService, get_ot_service
 from typing import Optional
-from geopy.distance import geodesic
-import time
+from time import perf_counter
+import asyncio
 
 router = APIRouter()
 
 
-@router.get("/buildcache", response_model=BuildCacheResponse)
-async def build_cache(
+def _bbox_dict(min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> dict:
+    """Build a bounding box dict in the shape used by logs and responses"""
+    return {
+        "min_lat": min_lat,
+        "max_lat": max_lat,
+        "min_lon": min_lon,
+        "max_lon": max_lon
+    }
+
+
+def buildcache_params(
     min_lat: float = Query(
         ...,
         description="Southern latitude of bounding box (decimal degrees)",
         ge=-90,
         le=90,
-        example=48.5
+        examples=[48.5]
     ),
     max_lat: float = Query(
         ...,
         description="Northern latitude of bounding box (decimal degrees)",
         ge=-90,
         le=90,
-        example=50.2
+        examples=[50.2]
     ),
     min_lon: float = Query(
         ...,
         description="Western longitude of bounding box (decimal degrees)",
         ge=-180,
         le=180,
-        example=23.3
+        examples=[23.3]
     ),
     max_lon: float = Query(
         ...,
         description="Eastern longitude of bounding box (decimal degrees)",
         ge=-180,
         le=180,
-        example=25.1
+        examples=[25.1]
     ),
     resolution: DEMResolution = Query(
-        default=DEMResolution.GLO_30,
+        default="GLO-30",
         description="DEM resolution: GLO-30 (30m) or GLO-90 (90m)"
     ),
     buffer_km: Optional[float] = Query(
         default=None,
         description="Extra margin around bounding box in kilometers",
         ge=0,
-        example=10
+        examples=[10]
     ),
     force_update: bool = Query(
         default=False,
         description="Redownload files even if they already exist"
-    ),
-    settings: Settings = Depends(get_settings)
+    )
+) -> BuildCacheParams:
+    """
+    Build validated BuildCacheParams from query parameters.
+
+    This is the single validation pass: FastAPI checks the per-field
+    range constraints and the model runs the cross-field checks
+    (ordering, bounding box size) exactly once.
+    """
+    try:
+        return BuildCacheParams(
+            min_lat=min_lat,
+            max_lat=max_lat,
+            min_lon=min_lon,
+            max_lon=max_lon,
+            resolution=resolution,
+            buffer_km=buffer_km,
+            force_update=force_update
+        )
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Validation error: {str(e)}"
+        )
+
+
+@router.get("/buildcache", response_model=BuildCacheResponse)
+async def build_cache(
+    params: BuildCacheParams = Depends(buildcache_params),
+    settings: Settings = Depends(get_settings),
+    ot_service: OpenTopographyService = Depends(get_ot_service)
 ):
     """
     Build Copernicus DEM cache for a specified bounding box.
@@ -88,60 +127,23 @@ async def build_cache(
     - Paths to cached data and mosaic
     - Execution time and log file location
     """
-    start_time = time.time()
+    # Monotonic clock: immune to NTP adjustments and cheaper to read
+    start_time = perf_counter()
     
     try:
-        # Validate API key
-        if not settings.topo_api_key or settings.topo_api_key == "your_api_key_here":
-            raise HTTPException(
-                status_code=500,
-                detail="OpenTopography API key not configured. Please set TOPO_API_KEY in .env file"
-            )
-        
-        # Validate parameters using Pydantic model
-        params = BuildCacheParams(
-            min_lat=min_lat,
-            max_lat=max_lat,
-            min_lon=min_lon,
-            max_lon=max_lon,
-            resolution=resolution,
-            buffer_km=buffer_km,
-            force_update=force_update
-        )
-        
-        # Additional validation
-        if max_lat <= min_lat:
-            raise HTTPException(
-                status_code=400,
-                detail="max_lat must be greater than min_lat"
-            )
-        
-        if max_lon <= min_lon:
-            raise HTTPException(
-                status_code=400,
-                detail="max_lon must be greater than min_lon"
-            )
-        
-        # Calculate distances for response
-        center_lon = (params.min_lon + params.max_lon) / 2
-        center_lat = (params.min_lat + params.max_lat) / 2
-        
-        north_south_distance = geodesic(
-            (params.min_lat, center_lon),
-            (params.max_lat, center_lon)
-        ).kilometers
-        
-        east_west_distance = geodesic(
-            (center_lat, params.min_lon),
-            (center_lat, params.max_lon)
-        ).kilometers
-        
-        # Step 1: Normalize AOI and apply buffer
+        # API key presence is validated once at startup (app lifespan)
+
+        # Reuse the distances already computed during model validation
+        north_south_distance = params.north_south_km
+        east_west_distance = params.east_west_km
+
+        # Step 1: Normalize AOI and apply buffer. Inputs are rounded to
+        # 6 decimals (~0.1 m) so equivalent boxes hit the memoized helpers.
         norm_min_lat, norm_max_lat, norm_min_lon, norm_max_lon = normalize_aoi(
-            params.min_lat,
-            params.max_lat,
-            params.min_lon,
-            params.max_lon,
+            round(params.min_lat, 6),
+            round(params.max_lat, 6),
+            round(params.min_lon, 6),
+            round(params.max_lon, 6),
             params.buffer_km
         )
         
@@ -153,42 +155,44 @@ async def build_cache(
             norm_max_lon
         )
         
+        resolution_value = params.resolution
+
+        # The same two bounding boxes appear in both the log payload and
+        # the response, so build them once
+        original_bbox = _bbox_dict(
+            params.min_lat, params.max_lat, params.min_lon, params.max_lon
+        )
+        normalized_bbox = _bbox_dict(
+            norm_min_lat, norm_max_lat, norm_min_lon, norm_max_lon
+        )
+
         # Step 3: Download tiles using OpenTopography service
-        ot_service = OpenTopographyService(settings)
         download_summary = await ot_service.download_tiles(
             tile_keys,
-            params.resolution.value,
+            resolution_value,
             params.force_update
         )
-        
-        # Step 4: Build VRT mosaic
-        mosaic_path = ot_service.build_vrt_mosaic(
-            params.resolution.value,
+
+        # Step 4: Build VRT mosaic in a worker thread - the GDAL build is
+        # blocking and would otherwise stall the event loop
+        mosaic_path = await asyncio.to_thread(
+            ot_service.build_vrt_mosaic,
+            resolution_value,
             tile_keys
         )
-        
+
         # Calculate execution time
-        execution_time = time.time() - start_time
-        
+        execution_time = perf_counter() - start_time
+
         # Prepare input parameters for logging
         input_params = {
-            "original_bbox": {
-                "min_lat": params.min_lat,
-                "max_lat": params.max_lat,
-                "min_lon": params.min_lon,
-                "max_lon": params.max_lon
-            },
-            "normalized_bbox": {
-                "min_lat": norm_min_lat,
-                "max_lat": norm_max_lat,
-                "min_lon": norm_min_lon,
-                "max_lon": norm_max_lon
-            },
-            "resolution": params.resolution.value,
+            "original_bbox": original_bbox,
+            "normalized_bbox": normalized_bbox,
+            "resolution": resolution_value,
             "buffer_km": params.buffer_km,
             "force_update": params.force_update
         }
-        
+
         # Step 5: Log summary
         log_file = await ot_service.log_summary(
             input_params,
@@ -199,24 +203,14 @@ async def build_cache(
         
         # Prepare response
         response_params = {
-            "original_bounding_box": {
-                "min_lat": params.min_lat,
-                "max_lat": params.max_lat,
-                "min_lon": params.min_lon,
-                "max_lon": params.max_lon
-            },
-            "normalized_bounding_box": {
-                "min_lat": norm_min_lat,
-                "max_lat": norm_max_lat,
-                "min_lon": norm_min_lon,
-                "max_lon": norm_max_lon
-            },
-            "resolution": params.resolution.value,
+            "original_bounding_box": original_bbox,
+            "normalized_bounding_box": normalized_bbox,
+            "resolution": resolution_value,
             "buffer_km": params.buffer_km,
             "force_update": params.force_update,
             "target_dir": settings.target_dir
         }
-        
+
         distances_info = {
             "north_south_km": round(north_south_distance, 2),
             "east_west_km": round(east_west_distance, 2),
@@ -228,7 +222,9 @@ async def build_cache(
             "tile_count": len(tile_keys)
         }
         
-        return BuildCacheResponse(
+        # The payload is already trusted/shaped, so skip the second
+        # Pydantic validation pass with model_construct
+        return BuildCacheResponse.model_construct(
             status="success",
             message=f"Cache build completed. Downloaded {len(download_summary['downloaded'])} tiles, "
                    f"skipped {len(download_summary['skipped'])} existing tiles, "
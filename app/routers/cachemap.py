@@ -1,19 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from pydantic import ValidationError
 from app.config import Settings, get_settings
-from app.models.cachemap import CacheMapParams, CacheMapResponse, SquareResult
+from app.models.cachemap import (
+    CacheMapParams,
+    CacheMapResponse,
+    GridSquare,
+    SquareResult
+)
 from app.models.buildcache import DEMResolution
 from app.services.grid_splitter import GridSplitter
-from app.services.tile_utils import normalize_aoi, compute_tile_keys
-from app.services.opentopography import OpenTopographyService
+from app.services.tile_utils import normalize_aoi_batch, compute_tile_keys_batch
+from app.services.opentopography import OpenTopographyService, get_ot_service
 from typing import Optional
-import time
+from time import perf_counter
 import asyncio
+import numpy as np
 from datetime import datetime
 from pathlib import Path
+import aiofiles
 import json
 
+# orjson serializes straight to UTF-8 bytes several times faster than
+# stdlib json; fall back to json if it is unavailable
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 router = APIRouter()
 
+# The splitter has no request-dependent state worth rebuilding, so one
+# module-level instance serves every request
+_GRID_SPLITTER = GridSplitter(square_size_km=100.0)
+
 
 @router.get("/cachemap", response_model=CacheMapResponse)
 async def cache_map(
@@ -46,7 +69,7 @@ async def cache_map(
         example=27.0
     ),
     resolution: DEMResolution = Query(
-        default=DEMResolution.GLO_30,
+        default="GLO-30",
         description="DEM resolution: GLO-30 (30m) or GLO-90 (90m)"
     ),
     buffer_km: Optional[float] = Query(
@@ -59,7 +82,9 @@ async def cache_map(
         default=False,
         description="Redownload files even if they already exist"
     ),
-    settings: Settings = Depends(get_settings)
+    background_tasks: BackgroundTasks = None,
+    settings: Settings = Depends(get_settings),
+    ot_service: OpenTopographyService = Depends(get_ot_service)
 ):
     """
     Build Copernicus DEM cache for a large area by splitting it into 100km squares.
@@ -91,17 +116,15 @@ async def cache_map(
     - Processing results for each square
     - Overall summary and execution time
     """
-    start_time = time.time()
-    
+    # Monotonic clock: immune to NTP adjustments and cheaper to read
+    start_time = perf_counter()
+
+    # API key presence is validated once at startup (app lifespan)
+
+    # Validate parameters before spawning any work, outside the broad
+    # handler below: a model-level ValidationError is a client error and
+    # must surface as 400, not be swallowed into the generic 500 path
     try:
-        # Validate API key
-        if not settings.topo_api_key or settings.topo_api_key == "your_api_key_here":
-            raise HTTPException(
-                status_code=500,
-                detail="OpenTopography API key not configured. Please set TOPO_API_KEY in .env file"
-            )
-        
-        # Validate parameters using Pydantic model
         params = CacheMapParams(
             min_lat=min_lat,
             max_lat=max_lat,
@@ -111,112 +134,149 @@ async def cache_map(
             buffer_km=buffer_km,
             force_update=force_update
         )
-        
-        # Initialize grid splitter
-        grid_splitter = GridSplitter(square_size_km=100.0)
-        
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Validation error: {str(e)}"
+        )
+
+    try:
+        # Shared grid splitter (see module scope)
+        grid_splitter = _GRID_SPLITTER
+
         # Calculate total area dimensions
         total_ns_km, total_ew_km = grid_splitter.calculate_total_area(
             params.min_lat, params.max_lat, params.min_lon, params.max_lon
         )
-        
-        # Split into grid squares
+
+        # Split into grid squares. rows/cols are captured immediately
+        # (no await in between) so concurrent requests sharing the
+        # splitter cannot overwrite them first.
         squares = grid_splitter.split_into_grid(
             params.min_lat, params.max_lat, params.min_lon, params.max_lon
         )
-        
-        # Initialize OpenTopography service
-        ot_service = OpenTopographyService(settings)
-        
-        # Process each square
-        results = []
-        total_downloaded = 0
-        total_skipped = 0
-        total_failed = 0
-        
-        for square in squares:
-            square_start_time = time.time()
-            
-            try:
-                # Normalize AOI for this square
-                norm_min_lat, norm_max_lat, norm_min_lon, norm_max_lon = normalize_aoi(
-                    square.min_lat,
-                    square.max_lat,
-                    square.min_lon,
-                    square.max_lon,
-                    params.buffer_km
-                )
-                
-                # Compute required tiles for this square
-                tile_keys = compute_tile_keys(
-                    norm_min_lat,
-                    norm_max_lat,
-                    norm_min_lon,
-                    norm_max_lon
-                )
-                
-                # Download tiles
-                download_summary = await ot_service.download_tiles(
-                    tile_keys,
-                    params.resolution.value,
-                    params.force_update
-                )
-                
-                # Build VRT mosaic for this square's tiles
-                ot_service.build_vrt_mosaic(
-                    params.resolution.value,
-                    tile_keys
-                )
-                
-                # Calculate execution time for this square
-                square_execution_time = time.time() - square_start_time
-                
-                # Accumulate totals
-                downloaded = len(download_summary['downloaded'])
-                skipped = len(download_summary['skipped'])
-                failed = len(download_summary['failed'])
-                
-                total_downloaded += downloaded
-                total_skipped += skipped
-                total_failed += failed
-                
-                # Create result for this square
-                result = SquareResult(
-                    square_id=square.square_id,
-                    status="success",
-                    tiles_downloaded=downloaded,
-                    tiles_skipped=skipped,
-                    tiles_failed=failed,
-                    execution_time_seconds=round(square_execution_time, 2)
-                )
-                
-                results.append(result)
-                
-            except Exception as e:
-                # Record error for this square but continue with others
-                square_execution_time = time.time() - square_start_time
-                result = SquareResult(
-                    square_id=square.square_id,
-                    status="error",
-                    tiles_downloaded=0,
-                    tiles_skipped=0,
-                    tiles_failed=0,
-                    execution_time_seconds=round(square_execution_time, 2),
-                    error=str(e)
+        grid_rows = grid_splitter.rows
+        grid_cols = grid_splitter.cols
+
+        # Compute the tiles needed by every square up front, in one
+        # vectorized pass over all square bounds rather than N scalar
+        # normalize/tile-key calls. Adjacent 100 km squares share 1×1°
+        # tiles at their boundaries, so the union is deduplicated into a
+        # single download batch instead of re-requesting the same tile
+        # once per square.
+        n = len(squares)
+        sq_min_lats = np.fromiter((s.min_lat for s in squares), dtype=np.float64, count=n)
+        sq_max_lats = np.fromiter((s.max_lat for s in squares), dtype=np.float64, count=n)
+        sq_min_lons = np.fromiter((s.min_lon for s in squares), dtype=np.float64, count=n)
+        sq_max_lons = np.fromiter((s.max_lon for s in squares), dtype=np.float64, count=n)
+
+        norm_bounds = normalize_aoi_batch(
+            sq_min_lats, sq_max_lats, sq_min_lons, sq_max_lons, params.buffer_km
+        )
+        per_square_keys = compute_tile_keys_batch(*norm_bounds)
+
+        seen = set()
+        all_keys = []
+        for keys in per_square_keys:
+            for key in keys:
+                if key not in seen:
+                    seen.add(key)
+                    all_keys.append(key)
+
+        # Single download pass over the deduplicated union; per-tile
+        # concurrency is bounded inside the service
+        download_summary = await ot_service.download_tiles(
+            all_keys,
+            params.resolution,
+            params.force_update
+        )
+
+        downloaded_set = set(download_summary['downloaded'])
+        skipped_set = set(download_summary['skipped'])
+        failed_set = {entry['tile'] for entry in download_summary['failed']}
+
+        # One master VRT over the union of tiles. The per-square builds
+        # all wrote to the same mosaic.vrt path, so N GDAL invocations
+        # produced nothing the single build over all_keys does not; run
+        # it in a worker thread because the GDAL build is blocking.
+        await asyncio.to_thread(
+            ot_service.build_vrt_mosaic,
+            params.resolution,
+            all_keys
+        )
+
+        # Build per-square results by intersecting each square's tiles
+        # with the global download outcome; tile totals come from the
+        # global summary so shared boundary tiles are counted once
+        # Preallocated and assigned by index: square ordering stays
+        # stable by construction and the list never reallocates
+        results = [None] * len(squares)
+        successful_squares = 0
+        failed_squares = 0
+        total_downloaded = len(download_summary['downloaded'])
+        total_skipped = len(download_summary['skipped'])
+        total_failed = len(download_summary['failed'])
+
+        for i, (square, keys) in enumerate(zip(squares, per_square_keys)):
+            tiles_failed = sum(1 for k in keys if k in failed_set)
+            results[i] = SquareResult(
+                square_id=square.square_id,
+                status="error" if tiles_failed else "success",
+                tiles_downloaded=sum(1 for k in keys if k in downloaded_set),
+                tiles_skipped=sum(1 for k in keys if k in skipped_set),
+                tiles_failed=tiles_failed,
+                execution_time_seconds=0.0,
+                error=(
+                    f"{tiles_failed} tile(s) failed to download"
+                    if tiles_failed else None
                 )
-                results.append(result)
-        
+            )
+            if tiles_failed:
+                failed_squares += 1
+            else:
+                successful_squares += 1
+
         # Calculate total execution time
-        total_execution_time = time.time() - start_time
-        
-        # Create log file
-        log_file = await _log_cachemap_summary(
+        total_execution_time = perf_counter() - start_time
+
+        # One summary dict serves both the response and the log file,
+        # so the two can never disagree; totals come from the
+        # deduplicated global download pass, not from re-summing the
+        # per-square intersections (which double-count shared tiles)
+        summary = {
+            "successful_squares": successful_squares,
+            "failed_squares": failed_squares,
+            "total_tiles_downloaded": total_downloaded,
+            "total_tiles_skipped": total_skipped,
+            "total_tiles_failed": total_failed
+        }
+
+        # Schedule the log write to run after the response is sent; the
+        # client should not wait on disk I/O that is not part of the
+        # response body. The path is computed now so it can be returned.
+        # One datetime.now() serves both the filename and the payload
+        # timestamp, so they can never disagree across a second (or
+        # midnight) boundary.
+        # Squares live as slotted GridSquareCore objects through the
+        # download phase; wrap them into Pydantic models only now, at
+        # the response boundary (model_construct, so no re-validation)
+        response_squares = [GridSquare.from_core(core) for core in squares]
+
+        now = datetime.now()
+        log_file = str(
+            Path(settings.log_dir)
+            / f"cachemap_{now.strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        background_tasks.add_task(
+            _log_cachemap_summary,
+            log_file=log_file,
+            timestamp=now.isoformat(),
             params=params,
-            squares=squares,
+            squares=response_squares,
             results=results,
+            summary=summary,
             total_area=(total_ns_km, total_ew_km),
-            execution_time=total_execution_time,
-            settings=settings
+            execution_time=total_execution_time
         )
         
         # Prepare response
@@ -228,19 +288,10 @@ async def cache_map(
         grid_info = {
             "total_squares": len(squares),
             "square_size_target_km": 100.0,
-            "rows": len(set(s.square_id.split('_')[1] for s in squares)),
-            "columns": len(set(s.square_id.split('_')[2] for s in squares))
-        }
-        
-        successful_squares = sum(1 for r in results if r.status == "success")
-        failed_squares = sum(1 for r in results if r.status == "error")
-        
-        summary = {
-            "successful_squares": successful_squares,
-            "failed_squares": failed_squares,
-            "total_tiles_downloaded": total_downloaded,
-            "total_tiles_skipped": total_skipped,
-            "total_tiles_failed": total_failed
+            # The splitter already knows the grid shape; no need to
+            # re-derive it by splitting every square_id
+            "rows": grid_rows,
+            "columns": grid_cols
         }
         
         return CacheMapResponse(
@@ -251,7 +302,7 @@ async def cache_map(
                    f"{total_skipped} skipped, {total_failed} failed.",
             total_area=total_area_info,
             grid_info=grid_info,
-            squares=squares,
+            squares=response_squares,
             results=results,
             summary=summary,
             execution_time_seconds=round(total_execution_time, 2),
@@ -271,35 +322,38 @@ async def cache_map(
 
 
 async def _log_cachemap_summary(
+    log_file: str,
+    timestamp: str,
     params: CacheMapParams,
     squares: list,
     results: list,
+    summary: dict,
     total_area: tuple,
-    execution_time: float,
-    settings: Settings
-) -> str:
+    execution_time: float
+):
     """
     Log the cachemap operation summary to a JSON file.
-    
+
+    Runs as a background task after the response is sent, so the write
+    latency never shows up in the client's time-to-first-byte.
+
     Args:
+        log_file: Destination path (already reported to the client)
+        timestamp: ISO timestamp taken when the path was generated
         params: CacheMapParams object
         squares: List of GridSquare objects
         results: List of SquareResult objects
+        summary: The summary dict returned in the response
         total_area: Tuple of (north_south_km, east_west_km)
         execution_time: Total execution time in seconds
-        settings: Application settings
-    
-    Returns:
-        Path to the log file
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_dir = Path(settings.log_dir)
-    log_dir.mkdir(parents=True, exist_ok=True)
-    
-    log_file = log_dir / f"cachemap_{timestamp}.json"
-    
-    log_data = {
-        "timestamp": datetime.now().isoformat(),
+    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+
+    # Fixed-size header and footer; the squares/results arrays are
+    # streamed one entry at a time below so the whole payload is never
+    # held in memory twice (dict plus serialized string)
+    head = {
+        "timestamp": timestamp,
         "endpoint": "/cachemap",
         "input_parameters": {
             "bounding_box": {
@@ -308,7 +362,7 @@ async def _log_cachemap_summary(
                 "min_lon": params.min_lon,
                 "max_lon": params.max_lon
             },
-            "resolution": params.resolution.value,
+            "resolution": params.resolution,
             "buffer_km": params.buffer_km,
             "force_update": params.force_update
         },
@@ -319,43 +373,35 @@ async def _log_cachemap_summary(
         "grid_info": {
             "total_squares": len(squares),
             "square_size_target_km": 100.0
-        },
-        "squares": [
-            {
-                "square_id": square.square_id,
-                "min_lat": square.min_lat,
-                "max_lat": square.max_lat,
-                "min_lon": square.min_lon,
-                "max_lon": square.max_lon,
-                "center_lat": square.center_lat,
-                "center_lon": square.center_lon
-            }
-            for square in squares
-        ],
-        "results": [
-            {
-                "square_id": result.square_id,
-                "status": result.status,
-                "tiles_downloaded": result.tiles_downloaded,
-                "tiles_skipped": result.tiles_skipped,
-                "tiles_failed": result.tiles_failed,
-                "execution_time_seconds": result.execution_time_seconds,
-                "error": result.error
-            }
-            for result in results
-        ],
-        "summary": {
-            "successful_squares": sum(1 for r in results if r.status == "success"),
-            "failed_squares": sum(1 for r in results if r.status == "error"),
-            "total_tiles_downloaded": sum(r.tiles_downloaded for r in results),
-            "total_tiles_skipped": sum(r.tiles_skipped for r in results),
-            "total_tiles_failed": sum(r.tiles_failed for r in results)
-        },
+        }
+    }
+    # The summary is the one already sent in the response: re-summing
+    # the per-square counters here would double-count tiles shared by
+    # adjacent squares
+    tail = {
+        "summary": summary,
         "execution_time_seconds": round(execution_time, 2)
     }
-    
-    with open(log_file, 'w') as f:
-        json.dump(log_data, f, indent=2)
-    
-    return str(log_file)
+
+    # Async write keeps the event loop free; compact JSON bytes (no
+    # indent, no intermediate str) keep both CPU and output size down
+    async with aiofiles.open(log_file, 'wb') as f:
+        await f.write(_dumps(head)[:-1])
+
+        # model_dump emits the serialized form directly; no hand-kept
+        # field list to drift out of sync with the models, and still no
+        # materialized list-of-dicts
+        await f.write(b', "squares": [')
+        for i, square in enumerate(squares):
+            if i:
+                await f.write(b', ')
+            await f.write(_dumps(square.model_dump()))
+
+        await f.write(b'], "results": [')
+        for i, result in enumerate(results):
+            if i:
+                await f.write(b', ')
+            await f.write(_dumps(result.model_dump()))
+
+        await f.write(b'], ' + _dumps(tail)[1:])
 
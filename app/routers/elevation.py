@@ -1,21 +1,67 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+# Serialize pre-dumped payloads with orjson when available, matching
+# the app-wide default response class; fall back to the stdlib-json
+# response if orjson is missing
+try:
+    import orjson  # noqa: F401 - presence check for ORJSONResponse
+    from fastapi.responses import ORJSONResponse as _JSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as _JSONResponse
 from app.config import Settings, get_settings
 from app.models.elevation import (
-    PointElevationRequest,
     PointElevationResponse,
-    ElevationDifferenceRequest,
+    BatchElevationRequest,
+    BatchElevationResponse,
+    BatchPointResult,
     ElevationDifferenceResponse,
     PointData
 )
-from app.services.elevation_service import ElevationService
-from app.services.elevation_logger import ElevationLogger
-from geopy.distance import geodesic
+from app.services.elevation_service import ElevationService, get_elevation_service
+from app.services.elevation_logger import ElevationLogger, get_elevation_logger
+from app.services.tile_utils import format_tile_key
+import asyncio
 import math
 import time
 
+# pyproj's Geod is C-backed and much faster than geopy's pure-Python
+# geodesic solver; fall back to a spherical haversine if it is missing
+try:
+    from pyproj import Geod
+    _GEOD = Geod(ellps="WGS84")
+except ImportError:
+    _GEOD = None
+
+_EARTH_RADIUS_M = 6371008.8
+
+# Degrees per radian, precomputed to skip the math.degrees call in the
+# difference hot path
+_RAD2DEG = 57.29577951308232
+
 router = APIRouter()
 
 
+def _geodesic_distance_meters(
+    lat1: float, lon1: float, lat2: float, lon2: float
+) -> float:
+    """
+    Ellipsoidal distance between two points in meters.
+
+    Uses pyproj's WGS84 geodesic (compiled C) when available, otherwise
+    the spherical haversine approximation.
+    """
+    if _GEOD is not None:
+        return _GEOD.inv(lon1, lat1, lon2, lat2)[2]
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dlat / 2.0) ** 2
+        + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2.0) ** 2
+    )
+    return 2.0 * _EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
 @router.get("/elevation/point", response_model=PointElevationResponse)
 async def get_point_elevation(
     latitude: float = Query(
@@ -37,7 +83,9 @@ async def get_point_elevation(
         description="DEM resolution: GLO-30 (30m) or GLO-90 (90m)",
         pattern="^(GLO-30|GLO-90)$"
     ),
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    logger: ElevationLogger = Depends(get_elevation_logger),
+    elevation_service: ElevationService = Depends(get_elevation_service)
 ):
     """
     Get elevation for a specific point from cached Copernicus DEM tiles.
@@ -73,27 +121,20 @@ async def get_point_elevation(
     start_time = time.time()
     
     try:
-        # Validate coordinates using Pydantic model
-        point = PointElevationRequest(
-            latitude=latitude,
-            longitude=longitude
-        )
-        
-        # Create elevation service
-        elevation_service = ElevationService(settings.target_dir)
-        
+        # Coordinates are already range-validated by the Query
+        # declarations; no second Pydantic pass is needed
         # Get elevation
         elevation, tile_key, error = elevation_service.get_elevation(
-            point.latitude,
-            point.longitude,
+            latitude,
+            longitude,
             resolution
         )
         
         # Prepare response
         if error:
             response = PointElevationResponse(
-                latitude=point.latitude,
-                longitude=point.longitude,
+                latitude=latitude,
+                longitude=longitude,
                 elevation_meters=None,
                 resolution=resolution,
                 tile_used=tile_key,
@@ -102,8 +143,8 @@ async def get_point_elevation(
             )
         elif elevation is None:
             response = PointElevationResponse(
-                latitude=point.latitude,
-                longitude=point.longitude,
+                latitude=latitude,
+                longitude=longitude,
                 elevation_meters=None,
                 resolution=resolution,
                 tile_used=tile_key,
@@ -112,8 +153,8 @@ async def get_point_elevation(
             )
         else:
             response = PointElevationResponse(
-                latitude=point.latitude,
-                longitude=point.longitude,
+                latitude=latitude,
+                longitude=longitude,
                 elevation_meters=round(elevation, 2),
                 resolution=resolution,
                 tile_used=tile_key,
@@ -124,19 +165,24 @@ async def get_point_elevation(
         # Calculate execution time
         execution_time = time.time() - start_time
         
-        # Log the query
-        logger = ElevationLogger(settings.log_dir)
+        # Serialize once: the same dict is logged and returned, so the
+        # model is not walked a second time by response_model encoding
+        payload = response.model_dump()
+
+        # Log the query (enqueued; written by the background drain task)
         await logger.log_point_query(
             input_params={
-                "latitude": point.latitude,
-                "longitude": point.longitude,
+                "latitude": latitude,
+                "longitude": longitude,
                 "resolution": resolution
             },
-            result=response.dict(),
-            execution_time=execution_time
+            result=payload,
+            execution_time=execution_time,
+            tile_lat=int(math.floor(latitude)),
+            tile_lon=int(math.floor(longitude))
         )
         
-        return response
+        return _JSONResponse(content=payload)
         
     except ValueError as e:
         raise HTTPException(
@@ -150,6 +196,77 @@ async def get_point_elevation(
         )
 
 
+@router.post("/elevation/batch", response_model=BatchElevationResponse)
+async def get_batch_elevation(
+    request: BatchElevationRequest,
+    elevation_service: ElevationService = Depends(get_elevation_service)
+):
+    """
+    Get elevations for a batch of points in one request.
+
+    Points are grouped by their containing tile and each tile's GeoTIFF
+    is sampled once for all of its points, so an elevation profile of
+    thousands of points costs one dataset read per distinct tile
+    instead of one HTTP round-trip and tile open per point.
+
+    **Limits:**
+    - 1 to 10,000 points per request
+
+    **Returns:**
+    - Per-point elevation, tile and status in input order
+    - count / success_count totals
+
+    **Note:** All tiles covering the points must be cached. Use
+    `/buildcache` first for the area of interest.
+    """
+    try:
+        coords = [(p.latitude, p.longitude) for p in request.points]
+
+        # The batched read is blocking raster I/O; run it off the event
+        # loop so concurrent requests keep being served
+        results = await asyncio.to_thread(
+            elevation_service.get_elevations_batch,
+            coords,
+            request.resolution
+        )
+
+        point_results = []
+        success_count = 0
+        for (lat, lon), (elevation, tile_key, error) in zip(coords, results):
+            if error:
+                status = "error"
+            elif elevation is None:
+                status = "no_data"
+            else:
+                status = "success"
+                success_count += 1
+                elevation = round(elevation, 2)
+            # model_construct skips revalidation of values this handler
+            # just produced
+            point_results.append(BatchPointResult.model_construct(
+                latitude=lat,
+                longitude=lon,
+                elevation_meters=elevation,
+                tile_used=tile_key,
+                status=status,
+                message=error
+            ))
+
+        return BatchElevationResponse.model_construct(
+            points=point_results,
+            count=len(point_results),
+            success_count=success_count,
+            resolution=request.resolution,
+            data_source="Copernicus DEM"
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
 @router.get("/elevation/check", response_model=dict)
 async def check_tile_availability(
     latitude: float = Query(
@@ -171,7 +288,9 @@ async def check_tile_availability(
         description="DEM resolution",
         pattern="^(GLO-30|GLO-90)$"
     ),
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    logger: ElevationLogger = Depends(get_elevation_logger),
+    elevation_service: ElevationService = Depends(get_elevation_service)
 ):
     """
     Check if a tile is available in cache for the given coordinates.
@@ -186,14 +305,10 @@ async def check_tile_availability(
     start_time = time.time()
     
     try:
-        from app.services.tile_utils import format_tile_key
-        import math
-        
         tile_lat = int(math.floor(latitude))
         tile_lon = int(math.floor(longitude))
         tile_key = format_tile_key(tile_lat, tile_lon)
         
-        elevation_service = ElevationService(settings.target_dir)
         is_available = elevation_service.check_tile_availability(
             latitude,
             longitude,
@@ -215,8 +330,7 @@ async def check_tile_availability(
         # Calculate execution time
         execution_time = time.time() - start_time
         
-        # Log the query
-        logger = ElevationLogger(settings.log_dir)
+        # Log the query (enqueued; written by the background drain task)
         await logger.log_check_query(
             input_params={
                 "latitude": latitude,
@@ -224,7 +338,9 @@ async def check_tile_availability(
                 "resolution": resolution
             },
             result=result,
-            execution_time=execution_time
+            execution_time=execution_time,
+            tile_lat=tile_lat,
+            tile_lon=tile_lon
         )
         
         return result
@@ -271,7 +387,9 @@ async def get_elevation_difference(
         description="DEM resolution: GLO-30 (30m) or GLO-90 (90m)",
         pattern="^(GLO-30|GLO-90)$"
     ),
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    logger: ElevationLogger = Depends(get_elevation_logger),
+    elevation_service: ElevationService = Depends(get_elevation_service)
 ):
     """
     Calculate elevation difference between two points.
@@ -312,31 +430,31 @@ async def get_elevation_difference(
     start_time = time.time()
     
     try:
-        # Validate coordinates
-        request = ElevationDifferenceRequest(
-            point1_latitude=point1_latitude,
-            point1_longitude=point1_longitude,
-            point2_latitude=point2_latitude,
-            point2_longitude=point2_longitude
+        # Coordinates are already range-validated by the Query
+        # declarations; no second Pydantic pass is needed
+        # Tile coordinates, computed once and shared with the logger
+        point1_tile = (
+            int(math.floor(point1_latitude)),
+            int(math.floor(point1_longitude))
         )
-        
-        # Create elevation service
-        elevation_service = ElevationService(settings.target_dir)
-        
-        # Get elevation for point 1
-        elev1, tile1, error1 = elevation_service.get_elevation(
-            request.point1_latitude,
-            request.point1_longitude,
-            resolution
+        point2_tile = (
+            int(math.floor(point2_latitude)),
+            int(math.floor(point2_longitude))
         )
-        
-        # Get elevation for point 2
-        elev2, tile2, error2 = elevation_service.get_elevation(
-            request.point2_latitude,
-            request.point2_longitude,
-            resolution
+
+        # Get both elevations in one batched read; when the points share
+        # a tile (the common case for nearby points) the GeoTIFF is
+        # opened and sampled exactly once
+        (elev1, tile1, error1), (elev2, tile2, error2) = (
+            elevation_service.get_elevations_batch(
+                [
+                    (point1_latitude, point1_longitude),
+                    (point2_latitude, point2_longitude)
+                ],
+                resolution
+            )
         )
-        
+
         # Check for errors
         if error1 or error2:
             errors = []
@@ -347,14 +465,14 @@ async def get_elevation_difference(
             
             response = ElevationDifferenceResponse(
                 point1=PointData(
-                    latitude=request.point1_latitude,
-                    longitude=request.point1_longitude,
+                    latitude=point1_latitude,
+                    longitude=point1_longitude,
                     elevation_meters=elev1,
                     tile_used=tile1
                 ),
                 point2=PointData(
-                    latitude=request.point2_latitude,
-                    longitude=request.point2_longitude,
+                    latitude=point2_latitude,
+                    longitude=point2_longitude,
                     elevation_meters=elev2,
                     tile_used=tile2
                 ),
@@ -369,19 +487,21 @@ async def get_elevation_difference(
             
             # Log error response
             execution_time = time.time() - start_time
-            logger = ElevationLogger(settings.log_dir)
+            payload = response.model_dump()
             await logger.log_difference_query(
                 input_params={
-                    "point1_latitude": request.point1_latitude,
-                    "point1_longitude": request.point1_longitude,
-                    "point2_latitude": request.point2_latitude,
-                    "point2_longitude": request.point2_longitude,
+                    "point1_latitude": point1_latitude,
+                    "point1_longitude": point1_longitude,
+                    "point2_latitude": point2_latitude,
+                    "point2_longitude": point2_longitude,
                     "resolution": resolution
                 },
-                result=response.dict(),
-                execution_time=execution_time
+                result=payload,
+                execution_time=execution_time,
+                point1_tile=point1_tile,
+                point2_tile=point2_tile
             )
-            return response
+            return _JSONResponse(content=payload)
         
         # Check if both elevations are available
         if elev1 is None or elev2 is None:
@@ -393,14 +513,14 @@ async def get_elevation_difference(
             
             response = ElevationDifferenceResponse(
                 point1=PointData(
-                    latitude=request.point1_latitude,
-                    longitude=request.point1_longitude,
+                    latitude=point1_latitude,
+                    longitude=point1_longitude,
                     elevation_meters=elev1,
                     tile_used=tile1
                 ),
                 point2=PointData(
-                    latitude=request.point2_latitude,
-                    longitude=request.point2_longitude,
+                    latitude=point2_latitude,
+                    longitude=point2_longitude,
                     elevation_meters=elev2,
                     tile_used=tile2
                 ),
@@ -415,52 +535,55 @@ async def get_elevation_difference(
             
             # Log no_data response
             execution_time = time.time() - start_time
-            logger = ElevationLogger(settings.log_dir)
+            payload = response.model_dump()
             await logger.log_difference_query(
                 input_params={
-                    "point1_latitude": request.point1_latitude,
-                    "point1_longitude": request.point1_longitude,
-                    "point2_latitude": request.point2_latitude,
-                    "point2_longitude": request.point2_longitude,
+                    "point1_latitude": point1_latitude,
+                    "point1_longitude": point1_longitude,
+                    "point2_latitude": point2_latitude,
+                    "point2_longitude": point2_longitude,
                     "resolution": resolution
                 },
-                result=response.dict(),
-                execution_time=execution_time
+                result=payload,
+                execution_time=execution_time,
+                point1_tile=point1_tile,
+                point2_tile=point2_tile
             )
-            return response
+            return _JSONResponse(content=payload)
         
         # Calculate elevation difference (point2 - point1)
         elevation_diff = elev2 - elev1
         
-        # Calculate horizontal distance using geodesic (great circle distance)
-        horizontal_distance = geodesic(
-            (request.point1_latitude, request.point1_longitude),
-            (request.point2_latitude, request.point2_longitude)
-        ).meters
+        # Calculate horizontal distance on the WGS84 ellipsoid
+        horizontal_distance = _geodesic_distance_meters(
+            point1_latitude,
+            point1_longitude,
+            point2_latitude,
+            point2_longitude
+        )
         
-        # Calculate slope
+        # Calculate slope in one arithmetic block: rise and grade are
+        # computed once and reused for angle, percentage and logging
         slope_degrees = None
         slope_percentage = None
         slope_radians = None
-        
+        rise = abs(elevation_diff)
+
         if horizontal_distance > 0:
-            # Slope angle in degrees
-            slope_radians = math.atan(abs(elevation_diff) / horizontal_distance)
-            slope_degrees = math.degrees(slope_radians)
-            
-            # Slope percentage (rise/run * 100)
-            slope_percentage = (abs(elevation_diff) / horizontal_distance) * 100
+            slope_radians = math.atan2(rise, horizontal_distance)
+            slope_degrees = slope_radians * _RAD2DEG
+            slope_percentage = (rise / horizontal_distance) * 100
         
         response = ElevationDifferenceResponse(
             point1=PointData(
-                latitude=request.point1_latitude,
-                longitude=request.point1_longitude,
+                latitude=point1_latitude,
+                longitude=point1_longitude,
                 elevation_meters=round(elev1, 2),
                 tile_used=tile1
             ),
             point2=PointData(
-                latitude=request.point2_latitude,
-                longitude=request.point2_longitude,
+                latitude=point2_latitude,
+                longitude=point2_longitude,
                 elevation_meters=round(elev2, 2),
                 tile_used=tile2
             ),
@@ -476,22 +599,26 @@ async def get_elevation_difference(
         # Calculate execution time
         execution_time = time.time() - start_time
         
+        # Serialize once for both the log record and the response body
+        payload = response.model_dump()
+
         # Log the query with all calculations
-        logger = ElevationLogger(settings.log_dir)
         await logger.log_difference_query(
             input_params={
-                "point1_latitude": request.point1_latitude,
-                "point1_longitude": request.point1_longitude,
-                "point2_latitude": request.point2_latitude,
-                "point2_longitude": request.point2_longitude,
+                "point1_latitude": point1_latitude,
+                "point1_longitude": point1_longitude,
+                "point2_latitude": point2_latitude,
+                "point2_longitude": point2_longitude,
                 "resolution": resolution
             },
-            result=response.dict(),
+            result=payload,
             execution_time=execution_time,
+            point1_tile=point1_tile,
+            point2_tile=point2_tile,
             calculations={
                 "geodesic_distance": {
-                    "point1": (request.point1_latitude, request.point1_longitude),
-                    "point2": (request.point2_latitude, request.point2_longitude),
+                    "point1": (point1_latitude, point1_longitude),
+                    "point2": (point2_latitude, point2_longitude),
                     "distance_meters": round(horizontal_distance, 2)
                 },
                 "elevation_data": {
@@ -500,14 +627,14 @@ async def get_elevation_difference(
                     "difference_raw": elevation_diff
                 },
                 "slope_formulas": {
-                    "rise": abs(elevation_diff),
+                    "rise": rise,
                     "run": horizontal_distance,
                     "angle_radians": slope_radians if horizontal_distance > 0 else None
                 }
             }
         )
         
-        return response
+        return _JSONResponse(content=payload)
         
     except ValueError as e:
         raise HTTPException(
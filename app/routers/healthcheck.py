@@ -1,41 +1,51 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
-from app.config import Settings, get_settings
+from fastapi import APIRouter
+from functools import lru_cache
+from app.config import get_settings
 import os
 
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
+def _get_payload() -> dict:
+    """
+    Build the healthcheck payload once.
+
+    Everything in it is fixed after startup (settings are a cached
+    snapshot and PORT does not change at runtime), and liveness probes
+    hit this endpoint every few seconds, so the handler should not
+    rebuild the nested dict per request.
+    """
+    settings = get_settings()
+    return {
+        "status": "OK",
+        "service": "Copernicus DEM FastAPI",
+        "environment": {
+            "target_dir": settings.target_dir,
+            "log_dir": settings.log_dir,
+            "port": os.getenv("PORT", "8000")
+        },
+        "api_key_configured": bool(settings.topo_api_key and settings.topo_api_key != "your_api_key_here"),
+        "endpoints": {
+            "docs": "/docs",
+            "map": "/map/",
+            "buildcache": "/buildcache",
+            "cachemap": "/cachemap",
+            "elevation_point": "/elevation/point",
+            "elevation_check": "/elevation/check",
+            "elevation_difference": "/elevation/difference"
+        }
+    }
+
+
 @router.get("/healthcheck")
-async def healthcheck(settings: Settings = Depends(get_settings)):
+async def healthcheck():
     """
     Health check endpoint to verify API accessibility and environment configuration.
-    
+
     Returns:
     - status: Service health status
     - environment: Configuration from environment variables
     - api_key_configured: Whether TOPO_API_KEY is set
     """
-    return JSONResponse(
-        status_code=200,
-        content={
-            "status": "OK",
-            "service": "Copernicus DEM FastAPI",
-            "environment": {
-                "target_dir": settings.target_dir,
-                "log_dir": settings.log_dir,
-                "port": os.getenv("PORT", "8000")
-            },
-            "api_key_configured": bool(settings.topo_api_key and settings.topo_api_key != "your_api_key_here"),
-                "endpoints": {
-                    "docs": "/docs",
-                    "map": "/map/",
-                    "buildcache": "/buildcache",
-                    "cachemap": "/cachemap",
-                    "elevation_point": "/elevation/point",
-                    "elevation_check": "/elevation/check",
-                    "elevation_difference": "/elevation/difference"
-                }
-        }
-    )
-
+    return _get_payload()
@@ -1,27 +1,159 @@
 """
 Logging service for elevation operations
 """
+import asyncio
 import json
-import aiofiles
+import os
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import date, datetime
+from typing import Dict, Any, Optional, Tuple
+
+from app.config import get_settings
+
+# orjson serializes straight to UTF-8 bytes several times faster than
+# stdlib json; fall back to json if it is unavailable
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
 
 
 class ElevationLogger:
     """
-    Service for logging elevation queries and operations
+    Service for logging elevation queries and operations.
+
+    Records are pushed onto an internal queue and written to disk by a
+    background task, so request handlers never wait on file I/O. The
+    writer appends one NDJSON line per record to a daily rolling file
+    (elevation-YYYY-MM-DD.ndjson), so a busy API pays one file open per
+    day instead of one inode per request. One shared instance per
+    process (see get_elevation_logger) also means the log directory is
+    created exactly once instead of per request.
     """
-    
-    def __init__(self, log_dir: str):
+
+    # Queued records beyond this are dropped rather than stalling
+    # request handling
+    QUEUE_MAXSIZE = 10000
+
+    # Directories already ensured to exist, so repeated construction
+    # (e.g. outside the shared singleton) skips the mkdir/stat
+    _dirs_ready = set()
+
+    def __init__(self, log_dir: str, verbose: bool = False):
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(parents=True, exist_ok=True)
-    
+        # When False (the default), records omit the derived
+        # middleware_calculations block - it only restates fields
+        # already present in input_parameters and result
+        self.verbose = verbose
+        if self.log_dir not in ElevationLogger._dirs_ready:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            ElevationLogger._dirs_ready.add(self.log_dir)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_MAXSIZE)
+        self._drain_task: Optional[asyncio.Task] = None
+        # Loop the queue and drain task belong to; see _enqueue
+        self._loop = None
+        self._fd: Optional[int] = None
+        self._fd_date: Optional[date] = None
+
+    def _log_path_for(self, day: date) -> Path:
+        return self.log_dir / f"elevation-{day.isoformat()}.ndjson"
+
+    def _enqueue(self, log_data: Dict[str, Any]):
+        """
+        Queue a record for the background writer, starting the drain
+        task on first use. Drops the record if the queue is full.
+
+        The queue and drain task bind to the event loop that first
+        uses them; when the running loop has changed (uvicorn reload,
+        a second test-client lifecycle) both are recreated on the new
+        loop - the same treatment OpenTopographyService gives its
+        HTTP session.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None:
+                # The old drain task died with its loop; just drop it
+                self._queue = asyncio.Queue(maxsize=self.QUEUE_MAXSIZE)
+                self._drain_task = None
+            self._loop = loop
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._drain())
+        try:
+            self._queue.put_nowait(log_data)
+        except asyncio.QueueFull:
+            pass
+
+    # Appends up to this size go straight to os.write; the kernel page
+    # cache absorbs them without blocking, so the executor round-trip
+    # aiofiles would pay per call is pure overhead
+    _INLINE_WRITE_MAX = 4096
+
+    def _get_fd(self) -> int:
+        """Return the append fd for today's file, rotating on date change."""
+        # UTC, like the record timestamps and the paths the log_*
+        # methods return: mixing in the local date would make the
+        # returned path name a different file than the one written for
+        # hours around midnight in non-UTC deployments
+        today = datetime.utcnow().date()
+        if self._fd is None or self._fd_date != today:
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = os.open(
+                self._log_path_for(today),
+                os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                0o644
+            )
+            self._fd_date = today
+        return self._fd
+
+    async def _drain(self):
+        """Append queued records to the daily log, one NDJSON line each."""
+        loop = asyncio.get_running_loop()
+        while True:
+            log_data = await self._queue.get()
+            try:
+                fd = self._get_fd()
+                payload = _dumps(log_data) + b"\n"
+                if len(payload) <= self._INLINE_WRITE_MAX:
+                    os.write(fd, payload)
+                else:
+                    await loop.run_in_executor(None, os.write, fd, payload)
+            except Exception:
+                # A failed log write must never take the drain loop down
+                pass
+            finally:
+                self._queue.task_done()
+
+    async def stop(self):
+        """Flush pending records and stop the background writer."""
+        # Only drain a task that belongs to the running loop; one left
+        # over from a previous loop is already dead and joining its
+        # queue would raise
+        if self._drain_task is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+        self._drain_task = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._fd_date = None
+
     async def log_point_query(
         self,
         input_params: Dict[str, Any],
         result: Dict[str, Any],
-        execution_time: float
+        execution_time: float,
+        tile_lat: int,
+        tile_lon: int
     ) -> str:
         """
         Log a single point elevation query.
@@ -30,24 +162,27 @@ class ElevationLogger:
             input_params: Input parameters (latitude, longitude, resolution)
             result: Query results (elevation, tile, status)
             execution_time: Time taken in seconds
+            tile_lat: Integer latitude of the containing tile
+            tile_lon: Integer longitude of the containing tile
         
         Returns:
-            Path to log file
+            Path to the daily log file the record is appended to
         """
         timestamp = datetime.utcnow()
-        log_filename = f"elevation_point_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}.json"
-        log_path = self.log_dir / log_filename
         
         log_data = {
             "operation": "elevation_point",
             "timestamp": timestamp.isoformat(),
             "execution_time_seconds": round(execution_time, 4),
             "input_parameters": input_params,
-            "result": result,
-            "middleware_calculations": {
+            "result": result
+        }
+
+        if self.verbose:
+            log_data["middleware_calculations"] = {
                 "tile_identification": {
-                    "tile_lat": int(input_params["latitude"] // 1),
-                    "tile_lon": int(input_params["longitude"] // 1),
+                    "tile_lat": tile_lat,
+                    "tile_lon": tile_lon,
                     "tile_used": result.get("tile_used")
                 },
                 "coordinate_validation": {
@@ -55,18 +190,18 @@ class ElevationLogger:
                     "longitude_valid": -180 <= input_params["longitude"] <= 180
                 }
             }
-        }
-        
-        async with aiofiles.open(log_path, 'w') as f:
-            await f.write(json.dumps(log_data, indent=2))
-        
-        return str(log_path)
+
+        self._enqueue(log_data)
+
+        return str(self._log_path_for(timestamp.date()))
     
     async def log_difference_query(
         self,
         input_params: Dict[str, Any],
         result: Dict[str, Any],
         execution_time: float,
+        point1_tile: Tuple[int, int],
+        point2_tile: Tuple[int, int],
         calculations: Optional[Dict[str, Any]] = None
     ) -> str:
         """
@@ -76,41 +211,56 @@ class ElevationLogger:
             input_params: Input parameters (two coordinate pairs, resolution)
             result: Query results (elevations, difference, slope, etc.)
             execution_time: Time taken in seconds
+            point1_tile: (tile_lat, tile_lon) containing the first point
+            point2_tile: (tile_lat, tile_lon) containing the second point
             calculations: Intermediate calculation details
         
         Returns:
-            Path to log file
+            Path to the daily log file the record is appended to
         """
         timestamp = datetime.utcnow()
-        log_filename = f"elevation_difference_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}.json"
-        log_path = self.log_dir / log_filename
         
         log_data = {
             "operation": "elevation_difference",
             "timestamp": timestamp.isoformat(),
             "execution_time_seconds": round(execution_time, 4),
             "input_parameters": input_params,
-            "result": result,
-            "middleware_calculations": {
+            "result": result
+        }
+
+        if self.verbose:
+            # Resolve every nested value once; the dict literal below
+            # then serializes in a single pass without repeated probes
+            point1 = result.get("point1", {})
+            point2 = result.get("point2", {})
+            diff = result.get("elevation_difference_meters")
+            if not diff:
+                direction = "flat"
+            elif diff > 0:
+                direction = "ascending"
+            else:
+                direction = "descending"
+
+            log_data["middleware_calculations"] = {
                 "point1_tile": {
-                    "tile_lat": int(input_params["point1_latitude"] // 1),
-                    "tile_lon": int(input_params["point1_longitude"] // 1),
-                    "tile_used": result.get("point1", {}).get("tile_used")
+                    "tile_lat": point1_tile[0],
+                    "tile_lon": point1_tile[1],
+                    "tile_used": point1.get("tile_used")
                 },
                 "point2_tile": {
-                    "tile_lat": int(input_params["point2_latitude"] // 1),
-                    "tile_lon": int(input_params["point2_longitude"] // 1),
-                    "tile_used": result.get("point2", {}).get("tile_used")
+                    "tile_lat": point2_tile[0],
+                    "tile_lon": point2_tile[1],
+                    "tile_used": point2.get("tile_used")
                 },
                 "distance_calculation": {
                     "method": "geodesic",
                     "horizontal_distance_meters": result.get("horizontal_distance_meters")
                 },
                 "elevation_calculations": {
-                    "point1_elevation": result.get("point1", {}).get("elevation_meters"),
-                    "point2_elevation": result.get("point2", {}).get("elevation_meters"),
-                    "difference": result.get("elevation_difference_meters"),
-                    "direction": "ascending" if result.get("elevation_difference_meters", 0) > 0 else "descending" if result.get("elevation_difference_meters", 0) < 0 else "flat"
+                    "point1_elevation": point1.get("elevation_meters"),
+                    "point2_elevation": point2.get("elevation_meters"),
+                    "difference": diff,
+                    "direction": direction
                 },
                 "slope_calculations": {
                     "angle_degrees": result.get("slope_degrees"),
@@ -118,21 +268,20 @@ class ElevationLogger:
                     "method": "atan(rise/run)"
                 }
             }
-        }
-        
-        if calculations:
-            log_data["middleware_calculations"]["additional"] = calculations
-        
-        async with aiofiles.open(log_path, 'w') as f:
-            await f.write(json.dumps(log_data, indent=2))
-        
-        return str(log_path)
+            if calculations:
+                log_data["middleware_calculations"]["additional"] = calculations
+
+        self._enqueue(log_data)
+
+        return str(self._log_path_for(timestamp.date()))
     
     async def log_check_query(
         self,
         input_params: Dict[str, Any],
         result: Dict[str, Any],
-        execution_time: float
+        execution_time: float,
+        tile_lat: int,
+        tile_lon: int
     ) -> str:
         """
         Log a tile availability check query.
@@ -141,24 +290,27 @@ class ElevationLogger:
             input_params: Input parameters (latitude, longitude, resolution)
             result: Check results (availability, tile_key)
             execution_time: Time taken in seconds
+            tile_lat: Integer latitude of the containing tile
+            tile_lon: Integer longitude of the containing tile
         
         Returns:
-            Path to log file
+            Path to the daily log file the record is appended to
         """
         timestamp = datetime.utcnow()
-        log_filename = f"elevation_check_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}.json"
-        log_path = self.log_dir / log_filename
         
         log_data = {
             "operation": "elevation_check",
             "timestamp": timestamp.isoformat(),
             "execution_time_seconds": round(execution_time, 4),
             "input_parameters": input_params,
-            "result": result,
-            "middleware_calculations": {
+            "result": result
+        }
+
+        if self.verbose:
+            log_data["middleware_calculations"] = {
                 "tile_identification": {
-                    "tile_lat": int(input_params["latitude"] // 1),
-                    "tile_lon": int(input_params["longitude"] // 1),
+                    "tile_lat": tile_lat,
+                    "tile_lon": tile_lon,
                     "tile_key": result.get("tile_key")
                 },
                 "cache_check": {
@@ -166,10 +318,20 @@ class ElevationLogger:
                     "resolution": input_params.get("resolution")
                 }
             }
-        }
-        
-        async with aiofiles.open(log_path, 'w') as f:
-            await f.write(json.dumps(log_data, indent=2))
-        
-        return str(log_path)
 
+        self._enqueue(log_data)
+
+        return str(self._log_path_for(timestamp.date()))
+
+
+
+@lru_cache(maxsize=1)
+def get_elevation_logger() -> ElevationLogger:
+    """
+    Get the shared ElevationLogger instance.
+
+    Use as a FastAPI dependency:
+    `logger: ElevationLogger = Depends(get_elevation_logger)`.
+    """
+    settings = get_settings()
+    return ElevationLogger(settings.log_dir, verbose=settings.log_verbose)
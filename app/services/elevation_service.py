@@ -2,9 +2,171 @@
 Service for querying elevation from cached DEM tiles
 """
 import math
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+from app.config import get_settings
 from app.services.tile_utils import format_tile_key
+from app.services.geo_math import gather_elevations
+
+# rasterio is the preferred reader; reads fall back to GDAL or PIL per
+# point when it is unavailable
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:
+    rasterio = None
+
+def configure_gdal_env():
+    """
+    Pin GDAL's cache behaviour for this process.
+
+    Left unconfigured, GDAL sizes its block cache at 5% of RAM per
+    process, which over-allocates under multi-worker uvicorn and
+    thrashes for single-pixel reads. The values come from Settings
+    (GDAL_CACHEMAX / VSI_CACHE_SIZE env vars) and are applied with
+    setdefault, so explicitly exported GDAL variables still win.
+    Called from the app lifespan before the first read; environment
+    config is GDAL's documented process-wide mechanism and, unlike a
+    rasterio.Env context, also covers the GDAL fallback reader and
+    costs nothing per request.
+    """
+    settings = get_settings()
+    os.environ.setdefault("GDAL_CACHEMAX", str(settings.gdal_cachemax))
+    os.environ.setdefault("VSI_CACHE", "TRUE")
+    os.environ.setdefault("VSI_CACHE_SIZE", str(settings.vsi_cache_size))
+    # Tile directories hold sidecar files; never scan them on open
+    os.environ.setdefault("GDAL_DISABLE_READDIR_ON_OPEN", "EMPTY_DIR")
+
+
+# Serializes access to the dataset cache below, so two threads cannot
+# open the same dataset twice and eviction cannot race a lookup
+_DATASET_LOCK = threading.Lock()
+
+# Most-recently-used open dataset handles, keyed by path. A plain
+# OrderedDict rather than lru_cache so eviction can close the handle
+# it drops the moment it falls out of the cache.
+_MAX_OPEN_DATASETS = 256
+_DATASET_CACHE: OrderedDict = OrderedDict()
+
+
+class _CachedDataset:
+    """
+    An open rasterio handle plus the lock serializing use of it.
+
+    A GDAL dataset handle must not be used by two threads at once, and
+    reads genuinely run on different threads here: batch reads execute
+    in worker threads via asyncio.to_thread while point reads run on
+    the event-loop thread. The lock is per dataset rather than global
+    so reads against different tiles still proceed in parallel.
+
+    `closed` is set (under the lock) when eviction or invalidation
+    closes the handle; readers that lose the race between looking the
+    entry up and locking it see the flag and retry with a fresh entry
+    instead of reading a closed dataset.
+    """
+    __slots__ = ("src", "lock", "closed")
+
+    def __init__(self, src):
+        self.src = src
+        self.lock = threading.Lock()
+        self.closed = False
+
+
+def get_dataset(path: str) -> _CachedDataset:
+    """
+    Return a cached open rasterio dataset for the given path.
+
+    Re-opening a GeoTIFF pays GDAL driver init plus TIFF header parsing
+    on every request; keeping up to 256 handles open amortizes that to
+    once per tile. The least recently used handle is closed when the
+    cache overflows, so the process never holds more than the cap in
+    open file descriptors. Readers should go through
+    open_locked_dataset, which takes the entry's lock and handles the
+    entry being closed between lookup and locking; nobody may close
+    the dataset directly.
+    """
+    with _DATASET_LOCK:
+        entry = _DATASET_CACHE.get(path)
+        if entry is not None:
+            _DATASET_CACHE.move_to_end(path)
+            return entry
+
+        entry = _CachedDataset(rasterio.open(path, sharing=False))
+        _DATASET_CACHE[path] = entry
+        while len(_DATASET_CACHE) > _MAX_OPEN_DATASETS:
+            _, evicted = _DATASET_CACHE.popitem(last=False)
+            _close_entry(evicted)
+        return entry
+
+
+def _close_entry(entry: _CachedDataset):
+    # Wait for any in-flight read before closing; lock order is always
+    # _DATASET_LOCK then entry.lock, so this cannot deadlock
+    with entry.lock:
+        entry.closed = True
+        try:
+            entry.src.close()
+        except Exception:
+            pass
+
+
+@contextmanager
+def open_locked_dataset(path: str):
+    """
+    Yield the open dataset for `path`, locked for exclusive use.
+
+    Closes the race between get_dataset handing an entry out and the
+    caller locking it: eviction or invalidate_dataset may close the
+    handle in that window, so a closed entry is discarded and the
+    lookup retried - the entry was already removed from the cache when
+    it was closed, so the retry opens the file afresh (and after a
+    tile rewrite, that is the new file).
+    """
+    while True:
+        entry = get_dataset(path)
+        entry.lock.acquire()
+        if not entry.closed:
+            break
+        entry.lock.release()
+    try:
+        yield entry.src
+    finally:
+        entry.lock.release()
+
+
+def invalidate_dataset(path: str):
+    """
+    Drop and close the cached handle for one tile path, if any.
+
+    Called by the download service after it rewrites a tile (force
+    refresh, COG conversion): os.replace swaps the inode underneath an
+    open handle, which would otherwise keep serving the old file's
+    data for the life of the process. The next read reopens the new
+    file.
+    """
+    with _DATASET_LOCK:
+        entry = _DATASET_CACHE.pop(path, None)
+        if entry is not None:
+            _close_entry(entry)
+
+
+def close_datasets():
+    """
+    Close every cached dataset handle and empty the cache.
+
+    Called from the app lifespan at shutdown so file descriptors are
+    released promptly rather than whenever GC collects evicted handles.
+    """
+    with _DATASET_LOCK:
+        while _DATASET_CACHE:
+            _, entry = _DATASET_CACHE.popitem(last=False)
+            _close_entry(entry)
 
 
 class ElevationService:
@@ -14,7 +176,33 @@ class ElevationService:
     
     def __init__(self, target_dir: str):
         self.target_dir = Path(target_dir)
-    
+        # Precomputed string directories: joining Path objects with /
+        # and calling .exists() per request is measurable on the hot
+        # endpoints; an f-string plus os.path.isfile is one stat call
+        self._resolution_dirs = {
+            res: str(self.target_dir / res) for res in ("GLO-30", "GLO-90")
+        }
+        # Tile paths confirmed present at least once. Tiles are only
+        # ever added to the cache in normal operation, so positive
+        # results stay valid; misses re-stat every time so a fresh
+        # buildcache shows up immediately.
+        self._known_tiles = set()
+
+    def _tile_path(self, tile_key: str, resolution: str) -> str:
+        res_dir = self._resolution_dirs.get(resolution)
+        if res_dir is None:
+            res_dir = str(self.target_dir / resolution)
+        return f"{res_dir}/{tile_key}/{tile_key}.tif"
+
+    def _tile_exists(self, tile_path: str) -> bool:
+        if tile_path in self._known_tiles:
+            return True
+        if os.path.isfile(tile_path):
+            self._known_tiles.add(tile_path)
+            return True
+        return False
+
+
     def get_elevation(
         self,
         latitude: float,
@@ -38,9 +226,9 @@ class ElevationService:
         tile_key = format_tile_key(tile_lat, tile_lon)
         
         # Check if tile exists in cache
-        tile_path = self.target_dir / resolution / tile_key / f"{tile_key}.tif"
-        
-        if not tile_path.exists():
+        tile_path = self._tile_path(tile_key, resolution)
+
+        if not self._tile_exists(tile_path):
             return None, tile_key, f"Tile {tile_key} not found in cache. Please run /buildcache first for this area."
         
         try:
@@ -57,9 +245,119 @@ class ElevationService:
         except Exception as e:
             return None, tile_key, f"Error reading elevation: {str(e)}"
     
+    def get_elevations_batch(
+        self,
+        points: List[Tuple[float, float]],
+        resolution: str = "GLO-30"
+    ) -> List[Tuple[Optional[float], Optional[str], Optional[str]]]:
+        """
+        Get elevations for several points with one dataset open per tile.
+
+        Points are bucketed by their containing 1×1° tile; each tile's
+        pixel indices are computed with one vectorized inverse-affine
+        multiply and gathered from a single windowed read bounding all
+        of that tile's points, so nearby points (the common case for
+        difference and profile queries) share one header parse and one
+        decode instead of paying them per point.
+
+        Args:
+            points: List of (latitude, longitude) pairs
+            resolution: DEM resolution (GLO-30 or GLO-90)
+
+        Returns:
+            List of (elevation_meters, tile_key, error_message) tuples
+            in input order
+        """
+        if rasterio is None:
+            # Without rasterio there is no sample(); fall back to the
+            # per-point path and its GDAL/PIL fallbacks
+            return [
+                self.get_elevation(lat, lon, resolution)
+                for lat, lon in points
+            ]
+
+        results = [None] * len(points)
+
+        # Bucket point indexes by containing tile
+        buckets = {}
+        for i, (lat, lon) in enumerate(points):
+            tile = (int(math.floor(lat)), int(math.floor(lon)))
+            buckets.setdefault(tile, []).append(i)
+
+        for (tile_lat, tile_lon), indexes in buckets.items():
+            tile_key = format_tile_key(tile_lat, tile_lon)
+            tile_path = self._tile_path(tile_key, resolution)
+
+            if not self._tile_exists(tile_path):
+                error = (
+                    f"Tile {tile_key} not found in cache. "
+                    f"Please run /buildcache first for this area."
+                )
+                for i in indexes:
+                    results[i] = (None, tile_key, error)
+                continue
+
+            try:
+                n = len(indexes)
+                lats = np.fromiter(
+                    (points[i][0] for i in indexes), dtype=np.float64, count=n
+                )
+                lons = np.fromiter(
+                    (points[i][1] for i in indexes), dtype=np.float64, count=n
+                )
+
+                # Locked handle: it must not be used by two threads at
+                # once (see _CachedDataset)
+                with open_locked_dataset(tile_path) as src:
+                    # Map all coordinates to pixel indices with one
+                    # inverse affine multiply instead of a Python loop
+                    # per point
+                    inv = ~src.transform
+                    cols = np.floor(inv.a * lons + inv.b * lats + inv.c).astype(np.intp)
+                    rows = np.floor(inv.d * lons + inv.e * lats + inv.f).astype(np.intp)
+                    np.clip(rows, 0, src.height - 1, out=rows)
+                    np.clip(cols, 0, src.width - 1, out=cols)
+
+                    # One windowed read bounding all points, then a
+                    # fancy-indexed gather - O(tiles) reads instead of
+                    # O(points)
+                    row0 = int(rows.min())
+                    col0 = int(cols.min())
+                    window = Window(
+                        col0,
+                        row0,
+                        int(cols.max()) - col0 + 1,
+                        int(rows.max()) - row0 + 1
+                    )
+                    arr = src.read(1, window=window)
+                    nodata = np.nan if src.nodata is None else float(src.nodata)
+                    scale = src.scales[0]
+                    offset = src.offsets[0]
+
+                # Gather + nodata masking in one (optionally numba-
+                # compiled) kernel; nodata comes back as NaN
+                values = gather_elevations(arr, rows - row0, cols - col0, nodata)
+
+                # Int16-quantized tiles carry their physical range in
+                # the band scale/offset; NaN passes through untouched
+                if scale != 1.0 or offset != 0.0:
+                    values = values * scale + offset
+                for i, elevation in zip(indexes, values.tolist()):
+                    if elevation != elevation:  # NaN: nodata pixel
+                        results[i] = (None, tile_key, None)
+                    else:
+                        results[i] = (elevation, tile_key, None)
+            except Exception as e:
+                for i in indexes:
+                    results[i] = (
+                        None, tile_key, f"Error reading elevation: {str(e)}"
+                    )
+
+        return results
+
     def _read_elevation_from_tile(
         self,
-        tile_path: Path,
+        tile_path: str,
         latitude: float,
         longitude: float,
         tile_lat: int,
@@ -78,80 +376,91 @@ class ElevationService:
         Returns:
             Elevation in meters or None if no data
         """
-        try:
-            # Try using rasterio first (preferred method)
-            import rasterio
-            from rasterio.windows import from_bounds
-            
-            with rasterio.open(tile_path) as src:
-                # Get the pixel coordinates for the point
-                row, col = src.index(longitude, latitude)
-                
-                # Read the elevation value at that pixel
-                # Handle out of bounds
-                if 0 <= row < src.height and 0 <= col < src.width:
-                    elevation = src.read(1)[row, col]
-                    
-                    # Check for NoData values
-                    if src.nodata is not None and elevation == src.nodata:
-                        return None
-                    
-                    return float(elevation)
-                else:
-                    return None
-                    
-        except ImportError:
-            # Fallback to GDAL if rasterio is not available
+        if rasterio is not None:
             try:
-                from osgeo import gdal
-                gdal.UseExceptions()
-                
-                ds = gdal.Open(str(tile_path))
-                if ds is None:
-                    return None
-                
-                # Get geotransform
-                gt = ds.GetGeoTransform()
-                
-                # Convert geographic coordinates to pixel coordinates
-                px = int((longitude - gt[0]) / gt[1])
-                py = int((latitude - gt[3]) / gt[5])
-                
-                # Read the band
-                band = ds.GetRasterBand(1)
-                
-                # Check bounds
-                if 0 <= px < ds.RasterXSize and 0 <= py < ds.RasterYSize:
-                    elevation = band.ReadAsArray(px, py, 1, 1)[0, 0]
-                    
-                    # Check for NoData
-                    nodata = band.GetNoDataValue()
-                    if nodata is not None and elevation == nodata:
+                # Preferred method: cached rasterio handle, no per-read
+                # header parse. The per-dataset lock keeps this read
+                # from interleaving with a batch read in a worker
+                # thread on the same handle.
+                with open_locked_dataset(tile_path) as src:
+                    # Get the pixel coordinates for the point
+                    row, col = src.index(longitude, latitude)
+
+                    # Read just the 1x1 window holding that pixel: a
+                    # full src.read(1) decodes the whole ~3600x3600
+                    # band (~25 MB) only to index one value
+                    # Handle out of bounds
+                    if 0 <= row < src.height and 0 <= col < src.width:
+                        elevation = src.read(1, window=Window(col, row, 1, 1))[0, 0]
+
+                        # Check for NoData values
+                        if src.nodata is not None and elevation == src.nodata:
+                            return None
+
+                        # Int16-quantized tiles carry their physical
+                        # range in the band scale/offset (identity for
+                        # raw tiles)
+                        return float(elevation) * src.scales[0] + src.offsets[0]
+                    else:
                         return None
-                    
-                    return float(elevation)
-                else:
+            except Exception as e:
+                raise Exception(f"Failed to read elevation from tile: {str(e)}")
+
+        # Fallback to GDAL if rasterio is not available
+        try:
+            from osgeo import gdal
+            gdal.UseExceptions()
+
+            ds = gdal.Open(tile_path)
+            if ds is None:
+                return None
+
+            # Get geotransform
+            gt = ds.GetGeoTransform()
+
+            # Convert geographic coordinates to pixel coordinates
+            px = int((longitude - gt[0]) / gt[1])
+            py = int((latitude - gt[3]) / gt[5])
+
+            # Read the band
+            band = ds.GetRasterBand(1)
+
+            # Check bounds
+            if 0 <= px < ds.RasterXSize and 0 <= py < ds.RasterYSize:
+                elevation = band.ReadAsArray(px, py, 1, 1)[0, 0]
+
+                # Check for NoData
+                nodata = band.GetNoDataValue()
+                if nodata is not None and elevation == nodata:
                     return None
-                    
-                ds = None
-                
-            except ImportError:
-                # Final fallback: use simple calculation based on position
-                # This is a very basic approximation and should not be used in production
-                # It's here only as a last resort
-                return self._fallback_elevation_read(
-                    tile_path,
-                    latitude,
-                    longitude,
-                    tile_lat,
-                    tile_lon
+
+                # Apply band scale/offset (identity for raw tiles)
+                scale = band.GetScale()
+                band_offset = band.GetOffset()
+                return (
+                    float(elevation) * (1.0 if scale is None else scale)
+                    + (0.0 if band_offset is None else band_offset)
                 )
+            else:
+                return None
+
+        except ImportError:
+            # Final fallback: use simple calculation based on position
+            # This is a very basic approximation and should not be used in production
+            # It's here only as a last resort
+            return self._fallback_elevation_read(
+                tile_path,
+                latitude,
+                longitude,
+                tile_lat,
+                tile_lon
+            )
         except Exception as e:
             raise Exception(f"Failed to read elevation from tile: {str(e)}")
     
     def _fallback_elevation_read(
         self,
-        tile_path: Path,
+        tile_path: str,
         latitude: float,
         longitude: float,
         tile_lat: int,
@@ -163,41 +472,35 @@ class ElevationService:
         """
         try:
             from PIL import Image
-            import struct
-            
-            # Open the TIFF file
-            img = Image.open(tile_path)
-            
+
+            # Decode once into an ndarray; getpixel goes through a
+            # Python-level accessor per call and PIL decodes the whole
+            # image either way
+            with Image.open(tile_path) as img:
+                arr = np.asarray(img)
+
             # Calculate pixel position
             # Assuming the tile is 1 degree x 1 degree
             # and typical Copernicus DEM tiles are 3600x3600 pixels
-            width, height = img.size
-            
+            height, width = arr.shape[0], arr.shape[1]
+
             # Calculate relative position within the tile (0 to 1)
             lat_offset = latitude - tile_lat
             lon_offset = longitude - tile_lon
-            
+
             # Convert to pixel coordinates
             px = int(lon_offset * width)
             py = int((1 - lat_offset) * height)  # Y is inverted in images
-            
+
             # Ensure we're within bounds
             px = max(0, min(px, width - 1))
             py = max(0, min(py, height - 1))
-            
-            # Get pixel value
-            pixel = img.getpixel((px, py))
-            
-            # If it's a single value, return it
-            if isinstance(pixel, (int, float)):
-                return float(pixel) if pixel != 0 else None
-            
-            # If it's a tuple, take the first value
-            if isinstance(pixel, tuple):
-                return float(pixel[0]) if pixel[0] != 0 else None
-            
-            return None
-            
+
+            # Multi-band images carry the elevation in the first band
+            pixel = arr[py, px] if arr.ndim == 2 else arr[py, px, 0]
+
+            return float(pixel) if pixel != 0 else None
+
         except Exception as e:
             raise Exception(f"Fallback elevation read failed: {str(e)}")
     
@@ -221,7 +524,17 @@ class ElevationService:
         tile_lat = int(math.floor(latitude))
         tile_lon = int(math.floor(longitude))
         tile_key = format_tile_key(tile_lat, tile_lon)
-        
-        tile_path = self.target_dir / resolution / tile_key / f"{tile_key}.tif"
-        return tile_path.exists()
 
+        return self._tile_exists(self._tile_path(tile_key, resolution))
+
+
+@lru_cache(maxsize=1)
+def get_elevation_service() -> ElevationService:
+    """
+    Get the shared ElevationService instance.
+
+    The service holds only the target directory, so one instance per
+    process is enough. Use as a FastAPI dependency:
+    `elevation_service: ElevationService = Depends(get_elevation_service)`.
+    """
+    return ElevationService(get_settings().target_dir)
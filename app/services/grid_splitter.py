@@ -3,8 +3,31 @@ Service for splitting large geographic areas into 100km squares
 """
 import math
 from typing import List, Tuple
-from geopy.distance import geodesic
-from app.models.cachemap import GridSquare
+import numpy as np
+from app.models.cachemap import GridSquareCore
+from app.services.geo_math import haversine_batch
+
+_EARTH_RADIUS_KM = 6371.0088
+
+# Kilometers per degree of latitude (and of longitude at the equator)
+_KM_PER_DEGREE = 111.195
+
+
+def haversine_km_np(lat1, lon1, lat2, lon2):
+    """
+    Vectorized haversine distance in kilometers.
+
+    Accepts scalars or NumPy arrays and broadcasts, so distances for an
+    entire grid of squares are computed in a single C-level pass instead
+    of one geodesic call per square. Delegates to the shared (optionally
+    numba-compiled) kernel in app.services.geo_math.
+    """
+    return haversine_batch(
+        np.asarray(lat1, dtype=np.float64),
+        np.asarray(lon1, dtype=np.float64),
+        np.asarray(lat2, dtype=np.float64),
+        np.asarray(lon2, dtype=np.float64)
+    )
 
 
 class GridSplitter:
@@ -20,6 +43,11 @@ class GridSplitter:
             square_size_km: Target size of each square in kilometers (default: 100km)
         """
         self.square_size_km = square_size_km
+        # Grid dimensions of the most recent split_into_grid call, so
+        # callers can read them directly instead of re-deriving them
+        # from the square_id strings
+        self.rows = 0
+        self.cols = 0
     
     def split_into_grid(
         self,
@@ -27,7 +55,7 @@ class GridSplitter:
         max_lat: float,
         min_lon: float,
         max_lon: float
-    ) -> List[GridSquare]:
+    ) -> List[GridSquareCore]:
         """
         Split a bounding box into approximately 100km squares.
         
@@ -43,87 +71,110 @@ class GridSplitter:
             max_lon: Eastern longitude
         
         Returns:
-            List of GridSquare objects
+            List of GridSquareCore objects
         """
-        squares = []
-        
         # Calculate center latitude for longitude calculations
         center_lat = (min_lat + max_lat) / 2
-        
+
         # Calculate degrees per 100km for latitude (consistent worldwide)
         # At equator: 1 degree ≈ 111 km, so 100km ≈ 0.9009 degrees
         lat_degrees_per_100km = self.square_size_km / 111.0
-        
+
         # Calculate degrees per 100km for longitude (varies by latitude)
         # At equator: 1 degree ≈ 111 km
         # At latitude L: 1 degree ≈ 111 * cos(L) km
         lon_degrees_per_100km = self.square_size_km / (111.0 * math.cos(math.radians(center_lat)))
-        
-        # Generate grid squares
-        current_lat = min_lat
-        lat_index = 0
-        
-        while current_lat < max_lat:
-            next_lat = min(current_lat + lat_degrees_per_100km, max_lat)
-            
-            current_lon = min_lon
-            lon_index = 0
-            
-            while current_lon < max_lon:
-                next_lon = min(current_lon + lon_degrees_per_100km, max_lon)
-                
-                # Calculate center point
-                square_center_lat = (current_lat + next_lat) / 2
-                square_center_lon = (current_lon + next_lon) / 2
-                
-                # Create square ID
-                square_id = f"square_{lat_index}_{lon_index}"
-                
-                # Create GridSquare object
-                square = GridSquare(
-                    square_id=square_id,
-                    min_lat=current_lat,
-                    max_lat=next_lat,
-                    min_lon=current_lon,
-                    max_lon=next_lon,
-                    center_lat=square_center_lat,
-                    center_lon=square_center_lon
-                )
-                
-                squares.append(square)
-                
-                current_lon = next_lon
-                lon_index += 1
-            
-            current_lat = next_lat
-            lat_index += 1
-        
-        return squares
+
+        # Compute all square bounds as arrays in one vectorized pass
+        # instead of accumulating edges in a nested Python loop
+        lat_starts = np.arange(min_lat, max_lat, lat_degrees_per_100km)
+        lon_starts = np.arange(min_lon, max_lon, lon_degrees_per_100km)
+        lat_ends = np.minimum(lat_starts + lat_degrees_per_100km, max_lat)
+        lon_ends = np.minimum(lon_starts + lon_degrees_per_100km, max_lon)
+        lat_centers = (lat_starts + lat_ends) / 2
+        lon_centers = (lon_starts + lon_ends) / 2
+
+        self.rows = rows = int(lat_starts.size)
+        self.cols = cols = int(lon_starts.size)
+
+        # Expand the edge vectors into full row/column grids and flatten
+        # them once; tolist() converts to Python floats in C, so the
+        # comprehension below does no per-element arithmetic or float()
+        # casts
+        lat0, lon0 = np.meshgrid(lat_starts, lon_starts, indexing='ij')
+        lat1, lon1 = np.meshgrid(lat_ends, lon_ends, indexing='ij')
+        latc, lonc = np.meshgrid(lat_centers, lon_centers, indexing='ij')
+
+        return [
+            GridSquareCore(
+                square_id=f"square_{i // cols}_{i % cols}",
+                min_lat=sq_min_lat,
+                max_lat=sq_max_lat,
+                min_lon=sq_min_lon,
+                max_lon=sq_max_lon,
+                center_lat=sq_center_lat,
+                center_lon=sq_center_lon
+            )
+            for i, (
+                sq_min_lat, sq_max_lat, sq_min_lon,
+                sq_max_lon, sq_center_lat, sq_center_lon
+            ) in enumerate(zip(
+                lat0.ravel().tolist(), lat1.ravel().tolist(),
+                lon0.ravel().tolist(), lon1.ravel().tolist(),
+                latc.ravel().tolist(), lonc.ravel().tolist()
+            ))
+        ]
     
-    def calculate_square_dimensions(self, square: GridSquare) -> Tuple[float, float]:
+    def calculate_square_dimensions(self, square: GridSquareCore) -> Tuple[float, float]:
         """
         Calculate the actual dimensions of a square in kilometers.
         
         Args:
-            square: GridSquare object
+            square: GridSquareCore object
         
         Returns:
             Tuple of (north_south_km, east_west_km)
         """
-        # North-south distance (latitude)
-        north_south_km = geodesic(
-            (square.min_lat, square.center_lon),
-            (square.max_lat, square.center_lon)
-        ).kilometers
-        
-        # East-west distance (longitude)
-        east_west_km = geodesic(
-            (square.center_lat, square.min_lon),
-            (square.center_lat, square.max_lon)
-        ).kilometers
+        # Both spans run along a meridian or a parallel, so the closed
+        # form is exact on a sphere and within ~0.3% of the iterative
+        # geodesic solver at degree scales - at a tiny fraction of the
+        # cost
+        north_south_km = (square.max_lat - square.min_lat) * _KM_PER_DEGREE
+        east_west_km = (
+            (square.max_lon - square.min_lon)
+            * _KM_PER_DEGREE
+            * math.cos(math.radians(square.center_lat))
+        )
         
         return north_south_km, east_west_km
-    
+
+    def calculate_square_dimensions_batch(
+        self,
+        squares: List[GridSquareCore]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate actual dimensions of all squares in one vectorized pass.
+
+        Args:
+            squares: List of GridSquareCore objects
+
+        Returns:
+            Tuple of (north_south_km, east_west_km) NumPy arrays, one
+            entry per square in input order
+        """
+        n = len(squares)
+        min_lats = np.fromiter((s.min_lat for s in squares), dtype=np.float64, count=n)
+        max_lats = np.fromiter((s.max_lat for s in squares), dtype=np.float64, count=n)
+        min_lons = np.fromiter((s.min_lon for s in squares), dtype=np.float64, count=n)
+        max_lons = np.fromiter((s.max_lon for s in squares), dtype=np.float64, count=n)
+        center_lats = np.fromiter((s.center_lat for s in squares), dtype=np.float64, count=n)
+        center_lons = np.fromiter((s.center_lon for s in squares), dtype=np.float64, count=n)
+
+        north_south_km = haversine_km_np(min_lats, center_lons, max_lats, center_lons)
+        east_west_km = haversine_km_np(center_lats, min_lons, center_lats, max_lons)
+
+        return north_south_km, east_west_km
+
     def calculate_total_area(
         self,
         min_lat: float,
@@ -144,19 +195,15 @@ class GridSplitter:
             Tuple of (north_south_km, east_west_km)
         """
         center_lat = (min_lat + max_lat) / 2
-        center_lon = (min_lon + max_lon) / 2
-        
-        # North-south distance
-        north_south_km = geodesic(
-            (min_lat, center_lon),
-            (max_lat, center_lon)
-        ).kilometers
         
-        # East-west distance
-        east_west_km = geodesic(
-            (center_lat, min_lon),
-            (center_lat, max_lon)
-        ).kilometers
+        # Lat-only and lon-only spans have a closed form; see
+        # calculate_square_dimensions
+        north_south_km = (max_lat - min_lat) * _KM_PER_DEGREE
+        east_west_km = (
+            (max_lon - min_lon)
+            * _KM_PER_DEGREE
+            * math.cos(math.radians(center_lat))
+        )
         
         return north_south_km, east_west_km
 
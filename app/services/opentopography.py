@@ -4,12 +4,36 @@ OpenTopography API service for downloading Copernicus DEM tiles
 import os
 import json
 import asyncio
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional, Set
 from datetime import datetime
 import aiohttp
 import aiofiles
-from app.config import Settings
+from app.config import Settings, get_settings
+from app.services.elevation_service import invalidate_dataset
+
+# orjson serializes straight to UTF-8 bytes several times faster than
+# stdlib json, which matters when a large run's failed-tiles list makes
+# the summary span megabytes; fall back to json if it is unavailable
+try:
+    import orjson
+
+    def _dumps_indented(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dumps_indented(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+
+@lru_cache(maxsize=1)
+def _gdal_available() -> bool:
+    """Whether the optional GDAL Python bindings are importable."""
+    try:
+        from osgeo import gdal  # noqa: F401
+        return True
+    except ImportError:
+        return False
 
 
 class OpenTopographyService:
@@ -18,13 +42,79 @@ class OpenTopographyService:
     """
     
     BASE_URL = "https://portal.opentopography.org/API/globaldem"
-    
+
+    # Retry policy for HTTP 429 (rate limited): exponential backoff
+    # starting at RETRY_BASE_DELAY seconds, doubling per attempt
+    MAX_RETRIES_429 = 3
+    RETRY_BASE_DELAY = 1.0
+
+    # Edge length in degrees of the super-cells used to coalesce
+    # adjacent fresh tiles into one bbox request. 3×3 = up to nine 1×1°
+    # tiles per request (~110,000 km² at the equator), safely below the
+    # provider's per-request area cap.
+    SUPER_TILE_DEGREES = 3
+
     def __init__(self, settings: Settings):
         self.settings = settings
         self.api_key = settings.topo_api_key
         self.target_dir = Path(settings.target_dir)
         self.log_dir = Path(settings.log_dir)
-        
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        # Global cap on in-flight downloads, shared by every caller so
+        # stacked concurrency (e.g. cachemap squares) cannot burst
+        # hundreds of simultaneous requests at the API
+        self._download_sem = asyncio.Semaphore(settings.topo_max_inflight)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared HTTP session, creating it on first use.
+
+        One keep-alive connection pool serves every tile download for
+        the life of the service, so consecutive requests reuse warm
+        TCP/TLS connections instead of handshaking per call. The session
+        is rebuilt if it was closed or belongs to a different event loop
+        (which only happens under test harnesses that cycle loops).
+        """
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=32,
+                    limit_per_host=16,
+                    ttl_dns_cache=300
+                )
+            )
+            self._session_loop = loop
+        return self._session
+
+    def warm_session(self) -> None:
+        """
+        Create the pooled HTTP session eagerly.
+
+        Called from the app lifespan at startup so the first /buildcache
+        request does not pay connector, DNS-cache and TLS-context setup;
+        must run inside the event loop the app serves on.
+        """
+        self._get_session()
+
+    async def close(self):
+        """Close the shared HTTP session if one was opened."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
     async def download_tiles(
         self,
         tile_keys: List[str],
@@ -44,7 +134,13 @@ class OpenTopographyService:
         """
         # Ensure directories exist
         self._ensure_directories(resolution)
-        
+
+        # Create every tile directory up front so the download tasks do
+        # not repeat a stat+mkdir syscall pair per tile under gather
+        resolution_dir = self.target_dir / resolution
+        for tile_key in set(tile_keys):
+            (resolution_dir / tile_key).mkdir(parents=True, exist_ok=True)
+
         downloaded_tiles = []
         skipped_tiles = []
         failed_tiles = []
@@ -53,33 +149,58 @@ class OpenTopographyService:
         # Map resolution to OpenTopography dataset
         dem_type = self._get_dem_type(resolution)
         
-        # Process each tile
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for tile_key in tile_keys:
-                task = self._download_single_tile(
+        # Shared keep-alive session: every tile reuses the same pooled
+        # connections instead of handshaking per download_tiles call
+        session = self._get_session()
+
+        # Coalesce adjacent fresh tiles into multi-degree bbox requests
+        # that GDAL splits back into per-tile files: one round-trip
+        # replaces up to nine. Tiles already on disk stay on the
+        # per-tile path so the skip check and force_update conditional
+        # GETs keep working; without the GDAL bindings everything does.
+        super_groups, single_keys = self._plan_super_tiles(tile_keys, resolution)
+
+        async def bounded_download(tile_key: str) -> Dict:
+            async with self._download_sem:
+                return await self._download_single_tile(
                     session, tile_key, resolution, dem_type, force_update
                 )
-                tasks.append(task)
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for tile_key, result in zip(tile_keys, results):
-                if isinstance(result, Exception):
-                    failed_tiles.append({
-                        "tile": tile_key,
-                        "error": str(result)
-                    })
-                elif result["status"] == "downloaded":
-                    downloaded_tiles.append(tile_key)
-                    total_bytes += result.get("bytes", 0)
-                elif result["status"] == "skipped":
-                    skipped_tiles.append(tile_key)
-                elif result["status"] == "failed":
-                    failed_tiles.append({
-                        "tile": tile_key,
-                        "error": result.get("error", "Unknown error")
-                    })
+
+        async def bounded_super(tiles: List) -> List[Dict]:
+            async with self._download_sem:
+                return await self._download_super_tile(
+                    session, tiles, resolution, dem_type, force_update
+                )
+
+        # Process each tile/super-cell concurrently
+        tasks = [bounded_download(tile_key) for tile_key in single_keys]
+        tasks += [bounded_super(group) for group in super_groups]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Flatten super-cell result lists back to (tile, result) pairs
+        paired = list(zip(single_keys, results[:len(single_keys)]))
+        for group, result in zip(super_groups, results[len(single_keys):]):
+            if isinstance(result, Exception):
+                paired.extend((tile_key, result) for tile_key, _, _ in group)
+            else:
+                paired.extend((r["tile"], r) for r in result)
+
+        for tile_key, result in paired:
+            if isinstance(result, Exception):
+                failed_tiles.append({
+                    "tile": tile_key,
+                    "error": str(result)
+                })
+            elif result["status"] == "downloaded":
+                downloaded_tiles.append(tile_key)
+                total_bytes += result.get("bytes", 0)
+            elif result["status"] == "skipped":
+                skipped_tiles.append(tile_key)
+            elif result["status"] == "failed":
+                failed_tiles.append({
+                    "tile": tile_key,
+                    "error": result.get("error", "Unknown error")
+                })
         
         summary = {
             "downloaded": downloaded_tiles,
@@ -91,6 +212,161 @@ class OpenTopographyService:
         
         return summary
     
+    def _plan_super_tiles(self, tile_keys: List[str], resolution: str):
+        """
+        Partition tile keys into coalesced super-cells and singles.
+
+        Tiles not yet on disk are grouped by the SUPER_TILE_DEGREES
+        super-cell containing them; cells holding two or more tiles are
+        fetched as one bbox request. Everything else - tiles already
+        downloaded (which need the skip check or a conditional GET) and
+        cells with a single fresh tile - keeps the per-tile path. When
+        the GDAL bindings are missing there is nothing to split the
+        bbox response with, so every tile is a single.
+
+        Returns:
+            Tuple of (super_groups, single_keys); each group is a list
+            of (tile_key, lat, lon) triples
+        """
+        if not _gdal_available():
+            return [], list(tile_keys)
+
+        from app.services.tile_utils import parse_tile_key
+
+        k = self.SUPER_TILE_DEGREES
+        cells = {}
+        singles = []
+        for tile_key in tile_keys:
+            tile_path = self.target_dir / resolution / tile_key / f"{tile_key}.tif"
+            if tile_path.exists():
+                singles.append(tile_key)
+                continue
+            lat, lon = parse_tile_key(tile_key)
+            cells.setdefault((lat // k, lon // k), []).append((tile_key, lat, lon))
+
+        super_groups = []
+        for tiles in cells.values():
+            if len(tiles) >= 2:
+                super_groups.append(tiles)
+            else:
+                singles.append(tiles[0][0])
+        return super_groups, singles
+
+    async def _download_super_tile(
+        self,
+        session: aiohttp.ClientSession,
+        tiles: List,
+        resolution: str,
+        dem_type: str,
+        force_update: bool
+    ) -> List[Dict]:
+        """
+        Download one bbox covering several tiles and split it locally.
+
+        Streams the multi-degree GeoTIFF to a temp file, then cuts the
+        per-tile files out with windowed gdal.Translate calls in a
+        worker thread. Any failure falls back to downloading the
+        group's tiles individually, so coalescing can only reduce
+        round-trips, never lose tiles.
+
+        Returns:
+            List of per-tile result dictionaries, as produced by
+            _download_single_tile
+        """
+        south = min(lat for _, lat, _ in tiles)
+        north = max(lat for _, lat, _ in tiles) + 1
+        west = min(lon for _, _, lon in tiles)
+        east = max(lon for _, _, lon in tiles) + 1
+
+        params = {
+            "demtype": dem_type,
+            "south": south,
+            "north": north,
+            "west": west,
+            "east": east,
+            "outputFormat": "GTiff",
+            "API_Key": self.api_key
+        }
+
+        tmp_path = self.target_dir / resolution / f".super_{south}_{west}.tif.part"
+        try:
+            for attempt in range(self.MAX_RETRIES_429 + 1):
+                async with session.get(
+                    self.BASE_URL, params=params, timeout=600
+                ) as response:
+                    if (
+                        response.status == 429 or response.status >= 500
+                    ) and attempt < self.MAX_RETRIES_429:
+                        await asyncio.sleep(self.RETRY_BASE_DELAY * (2 ** attempt))
+                        continue
+
+                    if response.status != 200:
+                        raise RuntimeError(
+                            f"HTTP {response.status} for super-tile "
+                            f"[{south},{west}]-[{north},{east}]"
+                        )
+
+                    async with aiofiles.open(tmp_path, 'wb') as f:
+                        async for chunk in response.content.iter_chunked(1 << 20):
+                            await f.write(chunk)
+                    break
+
+            return await asyncio.to_thread(
+                self._split_super_tile, tmp_path, tiles, resolution
+            )
+        except Exception:
+            # Per-tile fallback; runs sequentially under the semaphore
+            # slot this coroutine already holds
+            results = []
+            for tile_key, _, _ in tiles:
+                results.append(await self._download_single_tile(
+                    session, tile_key, resolution, dem_type, force_update
+                ))
+            return results
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _split_super_tile(
+        self,
+        super_path: Path,
+        tiles: List,
+        resolution: str
+    ) -> List[Dict]:
+        """
+        Cut per-tile GeoTIFFs out of a downloaded super-tile.
+
+        Blocking; run in a worker thread. Each child goes through the
+        same COG conversion as an individually downloaded tile.
+        """
+        from osgeo import gdal
+        gdal.UseExceptions()
+
+        results = []
+        src = gdal.Open(str(super_path))
+        try:
+            for tile_key, lat, lon in tiles:
+                child = self.target_dir / resolution / tile_key / f"{tile_key}.tif"
+                # projWin is [ulx, uly, lrx, lry]
+                ds = gdal.Translate(
+                    str(child), src, projWin=[lon, lat + 1, lon + 1, lat]
+                )
+                ds = None
+                self._convert_to_cog(child)
+                # Drop any cached reader handle for the rewritten path
+                invalidate_dataset(str(child))
+                results.append({
+                    "status": "downloaded",
+                    "tile": tile_key,
+                    "bytes": os.path.getsize(child),
+                    "path": str(child)
+                })
+        finally:
+            src = None
+        return results
+
     async def _download_single_tile(
         self,
         session: aiohttp.ClientSession,
@@ -115,12 +391,12 @@ class OpenTopographyService:
         west = lon
         east = lon + 1
         
-        # Create tile directory
+        # Tile directory (pre-created in bulk by download_tiles)
         tile_dir = self.target_dir / resolution / tile_key
-        tile_dir.mkdir(parents=True, exist_ok=True)
-        
+
         # Output file path
         output_file = tile_dir / f"{tile_key}.tif"
+        meta_file = tile_dir / f"{tile_key}.tif.meta.json"
         
         # Check if file already exists
         if output_file.exists() and not force_update:
@@ -130,6 +406,20 @@ class OpenTopographyService:
                 "reason": "already_exists"
             }
         
+        # With force_update and a previous download on disk, ask the
+        # server whether the tile actually changed: a 304 answer costs
+        # zero bytes of transfer
+        headers = {}
+        if force_update and output_file.exists() and meta_file.exists():
+            try:
+                meta = json.loads(meta_file.read_text())
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+            except (OSError, ValueError):
+                pass
+        
         # Build API request
         params = {
             "demtype": dem_type,
@@ -142,28 +432,73 @@ class OpenTopographyService:
         }
         
         try:
-            async with session.get(self.BASE_URL, params=params, timeout=300) as response:
-                if response.status == 200:
-                    # Download the file
-                    content = await response.read()
-                    
-                    # Save to disk
-                    async with aiofiles.open(output_file, 'wb') as f:
-                        await f.write(content)
-                    
-                    return {
-                        "status": "downloaded",
-                        "tile": tile_key,
-                        "bytes": len(content),
-                        "path": str(output_file)
-                    }
-                else:
-                    error_text = await response.text()
-                    return {
-                        "status": "failed",
-                        "tile": tile_key,
-                        "error": f"HTTP {response.status}: {error_text[:200]}"
-                    }
+            for attempt in range(self.MAX_RETRIES_429 + 1):
+                async with session.get(
+                    self.BASE_URL, params=params, headers=headers, timeout=300
+                ) as response:
+                    if (
+                        response.status == 429 or response.status >= 500
+                    ) and attempt < self.MAX_RETRIES_429:
+                        # Rate limited or transient server error: back
+                        # off exponentially and retry instead of letting
+                        # the tile land in `failed`
+                        await asyncio.sleep(self.RETRY_BASE_DELAY * (2 ** attempt))
+                        continue
+
+                    if response.status == 304:
+                        # Conditional GET matched the cached copy
+                        return {
+                            "status": "skipped",
+                            "tile": tile_key,
+                            "reason": "not_modified"
+                        }
+
+                    if response.status == 200:
+                        # Stream to disk in 1 MB chunks instead of
+                        # buffering the whole tile (50+ MB for GLO-30)
+                        # in memory, so peak RSS stays bounded however
+                        # many downloads run concurrently
+                        written = 0
+                        async with aiofiles.open(output_file, 'wb') as f:
+                            async for chunk in response.content.iter_chunked(1 << 20):
+                                await f.write(chunk)
+                                written += len(chunk)
+
+                        # Rewrite as a COG so point reads decode one
+                        # 256x256 block instead of a whole strip; runs
+                        # in a worker thread because gdal.Translate is
+                        # blocking
+                        await asyncio.to_thread(self._convert_to_cog, output_file)
+
+                        # The file (and possibly its inode, via the COG
+                        # os.replace) just changed; drop any cached
+                        # reader handle so queries see the new data
+                        invalidate_dataset(str(output_file))
+
+                        # Remember the validators so the next
+                        # force_update run can issue a conditional GET
+                        etag = response.headers.get("ETag")
+                        last_modified = response.headers.get("Last-Modified")
+                        if etag or last_modified:
+                            async with aiofiles.open(meta_file, 'w') as f:
+                                await f.write(json.dumps({
+                                    "etag": etag,
+                                    "last_modified": last_modified
+                                }))
+
+                        return {
+                            "status": "downloaded",
+                            "tile": tile_key,
+                            "bytes": written,
+                            "path": str(output_file)
+                        }
+                    else:
+                        error_text = await response.text()
+                        return {
+                            "status": "failed",
+                            "tile": tile_key,
+                            "error": f"HTTP {response.status}: {error_text[:200]}"
+                        }
         except asyncio.TimeoutError:
             return {
                 "status": "failed",
@@ -177,6 +512,85 @@ class OpenTopographyService:
                 "error": str(e)
             }
     
+    def _convert_to_cog(self, output_file: Path) -> None:
+        """
+        Rewrite a downloaded tile as a Cloud Optimized GeoTIFF in place.
+
+        OpenTopography may serve stripped GeoTIFFs, where a one-pixel
+        windowed read still decodes an entire multi-thousand-pixel
+        strip; the COG layout retiles the raster into 256×256 blocks
+        with overviews so point queries decode a single block. The
+        band is also quantized from Float32 to Int16 - Earth's
+        elevation range fits with 1 m precision - which halves the
+        bytes every later read has to move. Best effort: without the
+        GDAL bindings, or if the translate fails, the tile is kept
+        exactly as downloaded.
+        """
+        try:
+            from osgeo import gdal
+        except ImportError:
+            return
+
+        cog_path = f"{output_file}.cog"
+        try:
+            gdal.UseExceptions()
+            src_ds = gdal.Open(str(output_file))
+            src_nodata = src_ds.GetRasterBand(1).GetNoDataValue()
+
+            common = dict(
+                format="COG",
+                outputType=gdal.GDT_Int16,
+                creationOptions=[
+                    "BLOCKSIZE=256",
+                    "COMPRESS=DEFLATE",
+                    "PREDICTOR=2",
+                    "OVERVIEWS=AUTO"
+                ]
+            )
+            if (
+                src_nodata is None
+                or (
+                    src_nodata == src_nodata  # not NaN
+                    and float(src_nodata).is_integer()
+                    and -32768 <= src_nodata <= 32767
+                )
+            ):
+                # The source nodata (if any) survives the Int16 cast:
+                # propagate it so flagged pixels stay flagged. -32768 is
+                # only stamped when the source declared none at all.
+                result = gdal.Translate(
+                    cog_path,
+                    src_ds,
+                    noData=-32768 if src_nodata is None else src_nodata,
+                    **common
+                )
+            else:
+                # NaN or out-of-range nodata cannot be represented in
+                # Int16; Translate would only rewrite the metadata and
+                # let the flagged pixels through as plausible
+                # elevations, so Warp remaps them to -32768
+                result = gdal.Warp(
+                    cog_path,
+                    src_ds,
+                    srcNodata=src_nodata,
+                    dstNodata=-32768,
+                    **common
+                )
+            if result is None:
+                src_ds = None
+                return
+            # Drop the dataset handles so the file is flushed and
+            # closed before it replaces the raw download
+            result = None
+            src_ds = None
+            os.replace(cog_path, output_file)
+        except Exception:
+            # Keep the raw tile and clean up any partial COG
+            try:
+                os.remove(cog_path)
+            except OSError:
+                pass
+
     def _get_dem_type(self, resolution: str) -> str:
         """
         Map resolution to OpenTopography DEM type.
@@ -210,32 +624,46 @@ class OpenTopographyService:
             Path to VRT file or None if failed
         """
         try:
-            import rasterio
-            from rasterio.vrt import WarpedVRT
-            
             # Collect all existing tile files
             tile_files = []
             for tile_key in tile_keys:
                 tile_file = self.target_dir / resolution / tile_key / f"{tile_key}.tif"
                 if tile_file.exists():
                     tile_files.append(str(tile_file))
-            
+
             if not tile_files:
                 return None
-            
+
             # VRT output path
             vrt_path = self.target_dir / resolution / "mosaic.vrt"
-            
-            # Build VRT using gdalbuildvrt command
+
+            # Prefer in-process gdal.BuildVRT: no fork/exec and no cold
+            # GDAL process re-parsing every input TIFF
+            try:
+                from osgeo import gdal
+                gdal.UseExceptions()
+                vrt = gdal.BuildVRT(
+                    str(vrt_path),
+                    tile_files,
+                    options=gdal.BuildVRTOptions(resampleAlg="nearest")
+                )
+                vrt.FlushCache()
+                vrt = None
+                return str(vrt_path)
+            except ImportError:
+                pass
+
+            # Fall back to the gdalbuildvrt CLI when python bindings are
+            # not installed
             import subprocess
             cmd = [
                 "gdalbuildvrt",
                 str(vrt_path),
                 *tile_files
             ]
-            
+
             result = subprocess.run(cmd, capture_output=True, text=True)
-            
+
             if result.returncode == 0:
                 return str(vrt_path)
             else:
@@ -245,7 +673,7 @@ class OpenTopographyService:
                     for tile_file in tile_files:
                         f.write(f"{tile_file}\n")
                 return str(vrt_list_path)
-                
+
         except Exception as e:
             print(f"Warning: Could not build VRT mosaic: {e}")
             return None
@@ -288,8 +716,20 @@ class OpenTopographyService:
             "target_directory": str(self.target_dir)
         }
         
-        async with aiofiles.open(log_path, 'w') as f:
-            await f.write(json.dumps(log_data, indent=2))
+        async with aiofiles.open(log_path, 'wb') as f:
+            await f.write(_dumps_indented(log_data))
         
         return str(log_path)
 
+
+@lru_cache(maxsize=1)
+def get_ot_service() -> OpenTopographyService:
+    """
+    Get the shared OpenTopographyService instance.
+
+    The service is stateless apart from configuration, so one instance
+    per process is enough; constructing it in every request handler just
+    allocates the same object over and over. Use as a FastAPI dependency:
+    `ot_service: OpenTopographyService = Depends(get_ot_service)`.
+    """
+    return OpenTopographyService(get_settings())
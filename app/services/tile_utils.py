@@ -2,10 +2,26 @@
 Utility functions for tile calculations and AOI normalization
 """
 import math
+import re
+from functools import lru_cache
 from typing import List, Tuple
-from geopy.distance import geodesic
 
+import numpy as np
 
+# Tile keys look like N49E024 / S10W005; one compiled match replaces
+# the length-based slicing previously used to pull the pieces apart
+_TILE_KEY_RE = re.compile(r"([NS])(\d+)([EW])(\d+)$")
+
+# Preformatted zero-padded degree strings and direction letters, so
+# formatting a key is four table lookups and one concatenation with no
+# f-string machinery or abs() calls
+_LAT_DIR = ("S", "N")
+_LON_DIR = ("W", "E")
+_LAT_STR = tuple(f"{i:02d}" for i in range(91))
+_LON_STR = tuple(f"{i:03d}" for i in range(181))
+
+
+@lru_cache(maxsize=4096)
 def normalize_aoi(
     min_lat: float,
     max_lat: float,
@@ -15,7 +31,10 @@ def normalize_aoi(
 ) -> Tuple[float, float, float, float]:
     """
     Normalize Area of Interest and apply buffer if specified.
-    
+
+    Results are memoized: callers should round inputs to a fixed number
+    of decimals so equivalent bounding boxes hit the cache.
+
     Args:
         min_lat: Southern latitude
         max_lat: Northern latitude
@@ -52,15 +71,20 @@ def normalize_aoi(
     return min_lat, max_lat, min_lon, max_lon
 
 
+@lru_cache(maxsize=4096)
 def compute_tile_keys(
     min_lat: float,
     max_lat: float,
     min_lon: float,
     max_lon: float
-) -> List[str]:
+) -> Tuple[str, ...]:
     """
     Compute 1×1° tile keys for the given bounding box.
-    
+
+    Memoized, and returns an immutable tuple so cached results cannot be
+    mutated by callers. In a cachemap run adjacent squares repeat the
+    same normalized boxes, so the cache short-circuits the grid math.
+
     Tile naming convention: N49E024 means latitude 49-50°N, longitude 24-25°E
     - Latitude: N (north) or S (south) + 2-digit number
     - Longitude: E (east) or W (west) + 3-digit number
@@ -72,28 +96,118 @@ def compute_tile_keys(
         max_lon: Eastern longitude
     
     Returns:
-        List of tile keys (e.g., ['N49E024', 'N49E025', 'N50E024'])
+        Tuple of tile keys (e.g., ('N49E024', 'N49E025', 'N50E024'))
     """
-    tiles = []
-    
     # Get integer degree ranges
     lat_start = int(math.floor(min_lat))
     lat_end = int(math.ceil(max_lat))
     lon_start = int(math.floor(min_lon))
     lon_end = int(math.ceil(max_lon))
-    
-    for lat in range(lat_start, lat_end):
-        for lon in range(lon_start, lon_end):
-            tile_key = format_tile_key(lat, lon)
-            tiles.append(tile_key)
-    
-    return tiles
+
+    # Expand the degree ranges with a meshgrid and flatten once;
+    # formatting the key strings (cached) is the only remaining
+    # Python-level work, which matters for continent-sized boxes with
+    # thousands of tiles
+    lats = np.arange(lat_start, lat_end, dtype=np.int64)
+    lons = np.arange(lon_start, lon_end, dtype=np.int64)
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+
+    return tuple(
+        format_tile_key(lat, lon)
+        for lat, lon in zip(lat_grid.ravel().tolist(), lon_grid.ravel().tolist())
+    )
+
+
+def normalize_aoi_batch(
+    min_lats: np.ndarray,
+    max_lats: np.ndarray,
+    min_lons: np.ndarray,
+    max_lons: np.ndarray,
+    buffer_km: float = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized normalize_aoi over arrays of bounding boxes.
+
+    Buffers and clamps every box in a handful of NumPy array operations
+    instead of one scalar normalize_aoi call per box.
+
+    Args:
+        min_lats, max_lats, min_lons, max_lons: Per-box bounds, one
+            entry per box
+        buffer_km: Buffer to add in kilometers (optional, shared by all)
+
+    Returns:
+        Tuple of four arrays (min_lats, max_lats, min_lons, max_lons)
+    """
+    min_lats = np.asarray(min_lats, dtype=np.float64)
+    max_lats = np.asarray(max_lats, dtype=np.float64)
+    min_lons = np.asarray(min_lons, dtype=np.float64)
+    max_lons = np.asarray(max_lons, dtype=np.float64)
+
+    if buffer_km is not None and buffer_km > 0:
+        # Same approximation as normalize_aoi: latitude degrees are
+        # near-constant, longitude degrees shrink with cos(latitude)
+        lat_buffer_deg = buffer_km / 111.0
+        avg_lats = (min_lats + max_lats) / 2
+        lon_buffer_deg = buffer_km / (111.0 * np.cos(np.radians(avg_lats)))
+
+        min_lats = min_lats - lat_buffer_deg
+        max_lats = max_lats + lat_buffer_deg
+        min_lons = min_lons - lon_buffer_deg
+        max_lons = max_lons + lon_buffer_deg
+
+    return (
+        np.clip(min_lats, -90.0, 90.0),
+        np.clip(max_lats, -90.0, 90.0),
+        np.clip(min_lons, -180.0, 180.0),
+        np.clip(max_lons, -180.0, 180.0)
+    )
+
+
+def compute_tile_keys_batch(
+    min_lats: np.ndarray,
+    max_lats: np.ndarray,
+    min_lons: np.ndarray,
+    max_lons: np.ndarray
+) -> List[Tuple[str, ...]]:
+    """
+    Compute 1×1° tile keys for many bounding boxes at once.
+
+    The floor/ceil degree arithmetic happens in four vectorized array
+    operations; Python-level work is reduced to formatting the key
+    strings that have to be built anyway.
+
+    Args:
+        min_lats, max_lats, min_lons, max_lons: Per-box normalized
+            bounds, one entry per box
+
+    Returns:
+        List with one tuple of tile keys per input box, in input order
+    """
+    lat_starts = np.floor(min_lats).astype(np.int64)
+    lat_ends = np.ceil(max_lats).astype(np.int64)
+    lon_starts = np.floor(min_lons).astype(np.int64)
+    lon_ends = np.ceil(max_lons).astype(np.int64)
+
+    return [
+        tuple(
+            format_tile_key(lat, lon)
+            for lat in range(lat_starts[i], lat_ends[i])
+            for lon in range(lon_starts[i], lon_ends[i])
+        )
+        for i in range(lat_starts.size)
+    ]
 
 
+@lru_cache(maxsize=4096)
 def format_tile_key(lat: int, lon: int) -> str:
     """
     Format a tile key from integer lat/lon coordinates.
-    
+
+    Cached: only 64,800 distinct keys exist and the hot set is far
+    smaller, so repeat calls become a dict lookup instead of string
+    formatting.
+
     Examples:
         format_tile_key(49, 24) -> "N49E024"
         format_tile_key(-10, -5) -> "S10W005"
@@ -106,20 +220,15 @@ def format_tile_key(lat: int, lon: int) -> str:
     Returns:
         Formatted tile key string
     """
-    # Latitude: N or S
-    lat_dir = "N" if lat >= 0 else "S"
-    lat_abs = abs(lat)
-    
-    # Longitude: E or W
-    lon_dir = "E" if lon >= 0 else "W"
-    lon_abs = abs(lon)
-    
-    # Format: N49E024 (lat is 2 digits, lon is 3 digits)
-    tile_key = f"{lat_dir}{lat_abs:02d}{lon_dir}{lon_abs:03d}"
-    
-    return tile_key
+    # Format: N49E024 (lat is 2 digits, lon is 3 digits); built from
+    # the preformatted tables above
+    return (
+        _LAT_DIR[lat >= 0] + _LAT_STR[lat if lat >= 0 else -lat]
+        + _LON_DIR[lon >= 0] + _LON_STR[lon if lon >= 0 else -lon]
+    )
 
 
+@lru_cache(maxsize=4096)
 def parse_tile_key(tile_key: str) -> Tuple[int, int]:
     """
     Parse a tile key into lat/lon integers.
@@ -129,20 +238,18 @@ def parse_tile_key(tile_key: str) -> Tuple[int, int]:
     
     Returns:
         Tuple of (lat, lon) as integers
-    """
-    # Extract direction and numbers
-    lat_dir = tile_key[0]
-    lon_dir = tile_key[3] if len(tile_key) == 7 else tile_key[4]
-    
-    if len(tile_key) == 7:
-        lat_num = int(tile_key[1:3])
-        lon_num = int(tile_key[4:7])
-    else:
-        lat_num = int(tile_key[1:4])
-        lon_num = int(tile_key[5:8])
-    
-    lat = lat_num if lat_dir == "N" else -lat_num
-    lon = lon_num if lon_dir == "E" else -lon_num
     
+    Raises:
+        ValueError: If the key does not match the tile-key format
+    """
+    match = _TILE_KEY_RE.match(tile_key)
+    if match is None:
+        raise ValueError(f"Invalid tile key: {tile_key!r}")
+
+    lat_dir, lat_num, lon_dir, lon_num = match.groups()
+
+    lat = int(lat_num) if lat_dir == "N" else -int(lat_num)
+    lon = int(lon_num) if lon_dir == "E" else -int(lon_num)
+
     return lat, lon
 